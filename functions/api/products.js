@@ -27,9 +27,9 @@ export async function onRequestGet(context) {
   const inStock = url.searchParams.get('inStock');
 
   try {
-    // Busca products.json do próprio site
+    // Busca products.min.json do próprio site
     const siteUrl = url.origin;
-    const productsResponse = await fetch(`${siteUrl}/products.json`);
+    const productsResponse = await fetch(`${siteUrl}/products.min.json`);
 
     if (!productsResponse.ok) {
       throw new Error('Erro ao carregar produtos');
@@ -500,6 +500,11 @@ def get_required_attributes(category_id):
     return required
 
 
+def format_number(value):
+    """3000.0 -> '3000', 2.5 -> '2.5'"""
+    return f"{value:.0f}" if float(value).is_integer() else str(value)
+
+
 def infer_attr_from_product(attr_id, attr_name, product):
     """Tenta inferir valor de atributo a partir dos dados do produto."""
     name = product.get('name', '').lower()
@@ -520,50 +525,30 @@ def infer_attr_from_product(attr_id, attr_name, product):
             return None
         return None
 
+    # Atributos com unidade: já normalizados no scrape (product['attributes'])
+    attrs = product.get('attributes') or {}
+
     if attr_id in ('PEAK_POWER', 'MAX_POWER', 'POWER_OUTPUT'):
-        # Tenta extrair potência do nome (ex: "3kVA", "700VA", "2000W")
-        m = re.search(r'(\d+(?:[.,]\d+)?)\s*(kva|va|kw|w)\b', name, re.IGNORECASE)
-        if m:
-            val, unit = m.group(1), m.group(2).upper()
-            val = val.replace(',', '.')
-            # PEAK_POWER sempre usa VA
-            if attr_id == 'PEAK_POWER':
-                if unit in ('KVA', 'KW'):
-                    return f"{float(val) * 1000:.0f} VA"
-                elif unit == 'W':
-                    return f"{val} VA"
-                else:
-                    return f"{val} VA"
-            else:
-                if unit == 'KVA':
-                    return f"{float(val) * 1000:.0f} W"
-                elif unit == 'VA':
-                    return f"{val} W"
-                elif unit == 'KW':
-                    return f"{float(val) * 1000:.0f} W"
-                else:
-                    return f"{val} W"
-
-    if attr_id == 'VOLTAGE':
-        m = re.search(r'(\d+)\s*v(?:ac|dc|ca|cc)?\b', name, re.IGNORECASE)
-        if m:
-            return f"{m.group(1)}V"
-
-    if attr_id == 'SECTION_SIZE':
-        # Extrai seção do cabo (ex: "0,32mm²", "2.5mm²", "6mm²")
-        m = re.search(r'(\d+(?:[.,]\d+)?)\s*mm²', name, re.IGNORECASE)
-        if m:
-            val = m.group(1).replace(',', '.')
-            return f"{val} mm²"
+        # PEAK_POWER sempre usa VA; os demais, W (ex: "3kVA" -> 3000 VA / 3000 W)
+        if attr_id == 'PEAK_POWER':
+            value, unit = attrs.get('power_va', attrs.get('power_w')), 'VA'
+        else:
+            value, unit = attrs.get('power_w', attrs.get('power_va')), 'W'
+        if value is not None:
+            return f"{format_number(value)} {unit}"
+
+    if attr_id == 'VOLTAGE' and attrs.get('voltage_v') is not None:
+        return f"{format_number(attrs['voltage_v'])}V"
+
+    if attr_id == 'SECTION_SIZE' and attrs.get('section_mm2') is not None:
+        # Seção do cabo (ex: "0.32 mm²", "2.5 mm²", "6 mm²")
+        return f"{format_number(attrs['section_mm2'])} mm²"
 
     if attr_id == 'CONDUCTORS_NUMBER':
         return '1'
 
-    if attr_id == 'CABLE_LENGTH':
-        m = re.search(r'(\d+(?:[.,]\d+)?)\s*m(?:etro)?s?\b', name, re.IGNORECASE)
-        if m:
-            val = m.group(1).replace(',', '.')
-            return f"{val} m"
+    if attr_id == 'CABLE_LENGTH' and attrs.get('length_m') is not None:
+        return f"{format_number(attrs['length_m'])} m"
 
     return None
 
@@ -228,6 +228,8 @@ def export_to_mercadolivre(products_file: str, output_file: str):
         stats['total_ml_price'] += ml_price
         stats['total_profit'] += profit
 
+        attributes = product.get('attributes') or {}
+
         supplier = product.get('supplier', 'Desconhecido')
         if supplier not in stats['by_supplier']:
             stats['by_supplier'][supplier] = {'count': 0, 'cost': 0, 'ml_price': 0}
@@ -265,6 +267,13 @@ def export_to_mercadolivre(products_file: str, output_file: str):
             'url_fornecedor': product.get('sourceUrl', ''),
             'categoria_original': ' > '.join(product.get('categoryPath', []) or []),
             'taxa_ml': f"{category_fee*100:.1f}%",
+
+            # Atributos normalizados no scrape (tensão, potência, seção, comprimento)
+            'tensao_v': attributes.get('voltage_v', ''),
+            'potencia_w': attributes.get('power_w', ''),
+            'potencia_va': attributes.get('power_va', ''),
+            'secao_mm2': attributes.get('section_mm2', ''),
+            'comprimento_m': attributes.get('length_m', ''),
         }
 
         ml_products.append(ml_product)
@@ -9,6 +9,7 @@ Sincronização inteligente com Mercado Livre
 Uso:
   python ml_sync.py              # Sincroniza preços e estoque
   python ml_sync.py --dry-run    # Simula sem alterar nada
+  python ml_sync.py --changed-only  # Só produtos com preço/estoque alterado no último scrape
 """
 
 import json
@@ -26,6 +27,7 @@ ROOT_DIR = SCRIPT_DIR.parent
 PRODUCTS_FILE = ROOT_DIR / 'products.json'
 ML_MAP_FILE = ROOT_DIR / 'ml_products_map.json'
 CONFIG_FILE = ROOT_DIR / 'config_mercadolivre.json'
+CHANGES_FILE = ROOT_DIR / 'product_changes.json'
 
 ML_API_URL = 'https://api.mercadolibre.com'
 
@@ -37,6 +39,9 @@ ML_SHIPPING = 25.0  # R$ 25 frete
 ML_FEE_RATE = 0.18  # 18% taxa ML
 MIN_MARKUP = 0.35   # 35% markup mínimo
 
+# Grupos do change set do scraper que afetam o anúncio no ML
+SYNC_GROUPS = {'pricing', 'stock'}
+
 # Taxa Mercado Pago no site (para calcular custo original)
 MP_FEE_RATE = 0.0499
 
@@ -101,6 +106,15 @@ def load_products():
     return {p.get('sku', p.get('id', '')): p for p in data.get('products', []) if p.get('sku') or p.get('id')}
 
 
+def load_changed_skus():
+    """SKUs com preço ou estoque alterado no último scrape (None se não há change sets)"""
+    if not CHANGES_FILE.exists():
+        return None
+    with open(CHANGES_FILE, 'r') as f:
+        data = json.load(f)
+    return {c['sku'] for c in data.get('changes', []) if SYNC_GROUPS & set(c.get('groups', []))}
+
+
 def load_ml_map():
     """Carrega mapeamento ML"""
     if ML_MAP_FILE.exists():
@@ -176,7 +190,7 @@ def update_ml_item(headers, item_id, updates):
         return False
 
 
-def sync_products(dry_run=False):
+def sync_products(dry_run=False, changed_only=False):
     """Sincroniza produtos com ML"""
     log("=" * 60)
     log("SINCRONIZAÇÃO MERCADO LIVRE" + (" [DRY-RUN]" if dry_run else ""))
@@ -203,11 +217,23 @@ def sync_products(dry_run=False):
     log(f"Produtos locais: {len(products)}")
     log(f"Produtos mapeados ML: {len(ml_map)}")
 
+    wanted = None
+    if changed_only:
+        changed = load_changed_skus()
+        if changed is None:
+            log(f"Sem {CHANGES_FILE.name}: sincronizando todos os produtos")
+        else:
+            products = {sku: p for sku, p in products.items() if sku in changed}
+            wanted = set(products) | {sku.replace('LV-', '').replace('SE-', '') for sku in products}
+            log(f"Change sets: {len(products)} produtos com preço/estoque alterado")
+
     # Coleta IDs do ML para buscar
     ml_ids_to_fetch = []
     sku_to_ml_id = {}
 
     for sku, ml_data in ml_map.items():
+        if wanted is not None and sku not in wanted:
+            continue
         if ml_data.get('status') == 'active' and ml_data.get('ml_id'):
             ml_id = ml_data['ml_id'].replace('-', '')
             ml_ids_to_fetch.append(ml_id)
@@ -321,7 +347,9 @@ def sync_products(dry_run=False):
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Sincroniza produtos com Mercado Livre')
     parser.add_argument('--dry-run', action='store_true', help='Simula sem fazer alterações')
+    parser.add_argument('--changed-only', action='store_true',
+                        help='Só produtos com preço/estoque alterado no último scrape (product_changes.json)')
     args = parser.parse_args()
 
-    success = sync_products(dry_run=args.dry_run)
+    success = sync_products(dry_run=args.dry_run, changed_only=args.changed_only)
     sys.exit(0 if success else 1)
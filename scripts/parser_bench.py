@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Benchmark do parse de páginas de produto (MagazordScraper.parse_html)
+Roda sobre o corpus de páginas reais em scripts/corpus (Proesi, Loja Vale,
+Seel), gravado com --record a partir do html_cache de um crawl, e mede
+páginas/s e tempo por etapa de cada fornecedor, comparando com o baseline
+salvo em corpus/baseline.json.
+
+A velocidade vai para o baseline relativa a um laço de calibração rodado na
+mesma máquina, então a comparação vale entre máquinas; mesmo assim a queda
+de velocidade só é aviso (use --strict para falhar). Mudança no resultado
+do parse, fornecedor sem páginas no corpus ou sem baseline sempre falham.
+
+Uso:
+  python scraper.py --source all --test      # Crawl curto (10 produtos por fonte) que enche o html_cache
+  python parser_bench.py --record 5          # Copia 5 páginas por fornecedor do html_cache para o corpus
+  python parser_bench.py --update-baseline   # Grava as medições atuais como baseline
+  python parser_bench.py                     # Mede e compara com o baseline
+  python parser_bench.py --parser lxml       # Mede a engine lxml
+"""
+
+import re
+import json
+import sys
+import time
+import hashlib
+import argparse
+from pathlib import Path
+from urllib.parse import urlparse
+
+from scraper import SUPPLIERS, PARSER_ENGINES, MagazordScraper, ProductsDB, HtmlCache
+
+SCRIPT_DIR = Path(__file__).parent
+CORPUS_DIR = SCRIPT_DIR / 'corpus'
+INDEX_FILE = CORPUS_DIR / 'index.json'
+BASELINE_FILE = CORPUS_DIR / 'baseline.json'
+
+# Métodos do scraper cronometrados como etapas do parse
+STAGES = {
+    '_extract_data_product': 'dataProduct',
+    '_extract_json_ld': 'json_ld',
+    '_build_document': 'dom',
+}
+# Chamadas ao documento (seletores, texto e atributos) somadas numa etapa só
+DOCUMENT_CALLS = ('first', 'all', 'text', 'attr')
+# Laço de calibração: iterações por rodada e rodadas (vale a mais rápida)
+CALIBRATION_LOOPS = 20000
+CALIBRATION_ROUNDS = 5
+
+
+def calibrate() -> float:
+    """Velocidade desta máquina (laços/s) num trabalho fixo de regex, strings e dicts"""
+    pattern = re.compile(r'data-id="(\d+)">([^<]+)<')
+    best = None
+    for _ in range(CALIBRATION_ROUNDS):
+        started = time.perf_counter()
+        seen = {}
+        for i in range(CALIBRATION_LOOPS):
+            match = pattern.search(f'<div class="produto" data-id="{i}">Produto {i} R$ {i % 997},90</div>')
+            seen[match.group(1)] = match.group(2).lower().split()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return CALIBRATION_LOOPS / best
+
+
+def load_index() -> dict:
+    if not INDEX_FILE.exists():
+        return {}
+    with open(INDEX_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_corpus(sources: list[str]) -> dict:
+    """Páginas do corpus por fornecedor: [(arquivo, url, html)]"""
+    corpus = {source: [] for source in sources}
+    for filename, entry in sorted(load_index().items()):
+        if entry['supplier'] in corpus:
+            html_content = (CORPUS_DIR / filename).read_text(encoding='utf-8')
+            corpus[entry['supplier']].append((filename, entry['url'], html_content))
+    return corpus
+
+
+class TimedDocument:
+    """Documento que soma o tempo gasto em seletores/texto/atributos"""
+
+    def __init__(self, document, timings: dict):
+        self._document = document
+        self._timings = timings
+
+    def __getattr__(self, name):
+        value = getattr(self._document, name)
+        if name not in DOCUMENT_CALLS:
+            return value
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return value(*args, **kwargs)
+            finally:
+                self._timings['seletores'] += time.perf_counter() - started
+        return timed
+
+
+def instrument(scraper: MagazordScraper, timings: dict):
+    """Troca os métodos das etapas por versões cronometradas (só nesta instância)"""
+    for method, stage in STAGES.items():
+        original = getattr(scraper, method)
+
+        def timed(*args, _original=original, _stage=stage, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = _original(*args, **kwargs)
+            finally:
+                timings[_stage] += time.perf_counter() - started
+            if _stage == 'dom':
+                result = TimedDocument(result, timings)
+            return result
+        setattr(scraper, method, timed)
+
+
+def output_digest(product) -> str:
+    """Hash do produto extraído, para detectar mudança de resultado"""
+    data = product.to_dict() if product else None
+    return hashlib.sha1(json.dumps(data, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def bench_supplier(source: str, pages: list, parser_engine: str, rounds: int,
+                   calibration: float) -> tuple[dict, dict]:
+    """Mede o parse das páginas de um fornecedor; retorna (medições da melhor rodada, hashes de saída)"""
+    best = None
+    digests = {}
+    # Um scraper só para todas as rodadas, como num crawl
+    timings = {}
+    scraper = MagazordScraper(source, parser_engine=parser_engine)
+    instrument(scraper, timings)
+    for _ in range(rounds):
+        timings.update(dict.fromkeys(list(STAGES.values()) + ['seletores'], 0.0))
+
+        started = time.perf_counter()
+        for filename, url, html_content in pages:
+            product = scraper.parse_html(url, html_content)
+            digests[filename] = output_digest(product)
+        total = time.perf_counter() - started
+
+        if best is None or total < best['total']:
+            best = {'total': total, 'timings': dict(timings)}
+
+    total = best['total']
+    stages_ms = {stage: elapsed * 1000 / len(pages) for stage, elapsed in best['timings'].items()}
+    stages_ms['resto'] = max(total * 1000 / len(pages) - sum(stages_ms.values()), 0.0)
+    result = {
+        'pages': len(pages),
+        'pages_per_sec': len(pages) / max(total, 1e-9),
+        # Páginas por laço de calibração: o que se compara com o baseline
+        'relative_speed': len(pages) / max(total, 1e-9) / calibration,
+        'stages_ms': stages_ms,
+    }
+    return result, digests
+
+
+def record(sources: list[str], per_supplier: int):
+    """Copia páginas do html_cache local (crawls anteriores) para o corpus"""
+    db = ProductsDB()
+    html_cache = HtmlCache()
+    index = load_index()
+    for source in sources:
+        entries = db.get_html_cache_entries(SUPPLIERS[source]['name'])[:per_supplier]
+        (CORPUS_DIR / source).mkdir(parents=True, exist_ok=True)
+        for url, content_hash in entries:
+            html_content = html_cache.get(content_hash)
+            if not html_content:
+                continue
+            slug = urlparse(url).path.strip('/').replace('/', '_') or 'index'
+            filename = f'{source}/{slug}.html'
+            (CORPUS_DIR / filename).write_text(html_content, encoding='utf-8')
+            index[filename] = {'supplier': source, 'url': url}
+            print(f"  + {filename}")
+    with open(INDEX_FILE, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f"Corpus: {len(index)} páginas")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do parse de páginas de produto')
+    parser.add_argument('--source', choices=['proesi', 'lojavale', 'seel', 'all'], default='all',
+                        help='Fornecedor a medir (default: all)')
+    parser.add_argument('--parser', choices=list(PARSER_ENGINES), default='soup',
+                        help='Engine de parse (default: soup)')
+    parser.add_argument('--rounds', type=int, default=20,
+                        help='Rodadas sobre o corpus; vale a mais rápida (default: 20)')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Queda de velocidade relativa aceita antes do aviso (default: 0.2 = 20%%)')
+    parser.add_argument('--strict', action='store_true',
+                        help='Falhar também em queda de velocidade (default: só aviso)')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Gravar as medições atuais como baseline')
+    parser.add_argument('--record', type=int, metavar='N',
+                        help='Copiar N páginas por fornecedor do html_cache para o corpus e sair')
+    args = parser.parse_args()
+
+    sources = ['proesi', 'lojavale', 'seel'] if args.source == 'all' else [args.source]
+
+    if args.record:
+        record(sources, args.record)
+        return 0
+
+    baseline = {}
+    if BASELINE_FILE.exists():
+        with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    engine_baseline = baseline.get(args.parser, {})
+
+    calibration = calibrate()
+    print(f"\n=== Benchmark de parse ({args.parser}, {args.rounds} rodadas) ===")
+    print(f"Calibração: {calibration:,.0f} laços/s\n")
+    results = {}
+    problems = []
+    warnings = []
+    corpus = load_corpus(sources)
+    # Sem páginas não há o que medir: o gate falha em vez de passar sem dados
+    missing = [SUPPLIERS[source]['name'] for source, pages in corpus.items() if not pages]
+    if missing:
+        print("CORPUS VAZIO:")
+        for name in missing:
+            print(f"  ✗ {name}: nenhuma página no corpus (grave com --record)")
+        return 1
+
+    for source, pages in corpus.items():
+        name = SUPPLIERS[source]['name']
+
+        result, digests = bench_supplier(source, pages, args.parser, args.rounds, calibration)
+        results[source] = {**result, 'outputs': digests}
+
+        print(f"{name}: {result['pages']} páginas, {result['pages_per_sec']:.1f} páginas/s")
+        for stage, ms in result['stages_ms'].items():
+            print(f"  {stage:<12} {ms:8.3f} ms/página")
+
+        previous = engine_baseline.get(source)
+        if not previous:
+            if not args.update_baseline:
+                problems.append(f"{name}: sem baseline para {args.parser} (rode --update-baseline)")
+            continue
+        change = result['relative_speed'] / previous['relative_speed'] - 1
+        print(f"  baseline     {previous['relative_speed'] * calibration:.1f} páginas/s "
+              f"nesta máquina ({change:+.0%})")
+        if change < -args.tolerance:
+            slowdown = f"{name}: velocidade relativa caiu {change:+.0%}"
+            (problems if args.strict else warnings).append(slowdown)
+        changed = sorted(f for f, digest in digests.items() if previous['outputs'].get(f) not in (None, digest))
+        for filename in changed:
+            problems.append(f"{name}: resultado do parse mudou em {filename}")
+        print()
+
+    if args.update_baseline:
+        baseline[args.parser] = {**engine_baseline, **results}
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Baseline atualizado: {BASELINE_FILE}")
+        return 0
+
+    if warnings:
+        print("\nAVISOS (velocidade; confira rodando de novo ou com --strict):")
+        for warning in warnings:
+            print(f"  ! {warning}")
+    if problems:
+        print("\nREGRESSÕES:")
+        for problem in problems:
+            print(f"  ✗ {problem}")
+        return 1
+    print("\nSem regressões em relação ao baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,7 +3,7 @@
 Scraper de produtos para Blumenau Automação
 Importa produtos de Proesi, Loja Vale e Seel Distribuidora (todos usam Magazord)
 Suporta:
-- Processamento paralelo (multi-threaded)
+- Processamento paralelo (multi-threaded ou asyncio com --engine async)
 - Continuar de onde parou (resume)
 - Updates incrementais (só processa produtos que mudaram)
 - Exportação para Mercado Livre/Shopee
@@ -12,24 +12,48 @@ Suporta:
 import json
 import re
 import time
+import asyncio
 import argparse
 import logging
 import sqlite3
 import hashlib
 import html
 import csv
-from datetime import datetime, timezone
+import gzip
+import zlib
+import os
+import tempfile
+import itertools
+import unicodedata
+import xml.etree.ElementTree as ET
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone, timedelta
 from pathlib import Path
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Tuple, Iterable, Iterator
 from urllib.parse import urljoin, urlparse
-from dataclasses import dataclass, asdict
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, asdict, fields
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 import threading
+import queue
+import atexit
 
 import requests
+import lxml.etree
+import lxml.html
+import soupsieve
 from bs4 import BeautifulSoup
 
+try:
+    import aiohttp  # Necessário apenas para --engine async
+except ImportError:
+    aiohttp = None
+
+try:
+    import brotli  # Opcional: só para o products.min.json.br
+except ImportError:
+    brotli = None
+
 # Configuração de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -40,7 +64,12 @@ logger = logging.getLogger(__name__)
 # Diretório base do projeto
 BASE_DIR = Path(__file__).parent.parent
 PRODUCTS_FILE = BASE_DIR / "products.json"
+MIN_PRODUCTS_FILE = BASE_DIR / "products.min.json"  # Servido ao site (com irmãos .gz/.br)
+CATALOG_DIR = BASE_DIR / "catalog"  # Artefatos derivados do products.json para o site
+CHANGES_FILE = BASE_DIR / "product_changes.json"
 DB_FILE = BASE_DIR / "scripts" / "products.db"
+HTML_CACHE_DIR = BASE_DIR / "scripts" / "html_cache"
+JOURNAL_FILE = BASE_DIR / "scripts" / "products.journal.jsonl"
 
 # Headers para requests
 HEADERS = {
@@ -56,22 +85,316 @@ SUPPLIERS = {
         'base_url': 'https://www.proesi.com.br',
         'sitemap': 'https://www.proesi.com.br/sitemap-produto.xml',
         'id_prefix': '',
+        'rate_limit': 10.0,  # Requests por segundo (budget do host)
     },
     'lojavale': {
         'name': 'Loja Vale',
         'base_url': 'https://www.lojavale.com.br',
         'sitemap': 'https://www.lojavale.com.br/sitemap-produto.xml',
         'id_prefix': 'LV-',
+        'rate_limit': 10.0,
     },
     'seel': {
         'name': 'Seel Distribuidora',
         'base_url': 'https://www.seeldistribuidora.com.br',
         'sitemap': 'https://www.seeldistribuidora.com.br/sitemap-produto.xml',
         'id_prefix': 'SE-',
+        'rate_limit': 10.0,
     },
 }
 
 
+# JSON-LD lido direto do HTML (equivalente a soup.find_all('script', type='application/ld+json'))
+JSON_LD_RE = re.compile(
+    r'<script\b[^>]*?\btype\s*=\s*(?:"application/ld\+json"|\'application/ld\+json\'|application/ld\+json(?=[\s>]))'
+    r'[^>]*>(.*?)</script\s*>',
+    re.IGNORECASE | re.DOTALL
+)
+
+# Condições necessárias para os seletores HTML dos campos que não vêm do
+# dataProduct: se o padrão não aparece no HTML, o seletor não tem como casar
+# e o DOM não precisa ser montado
+HTML_HINTS = {
+    'specs': re.compile(r'caracteristicas', re.IGNORECASE),
+    'datasheet': re.compile(r'href\s*=\s*["\']?[^"\'>]*?(?:datasheet|manual|\.pdf)', re.IGNORECASE),
+    'warranty': re.compile(r'class\s*=\s*["\']?[^"\'>]*?(?:garantia|warranty)', re.IGNORECASE),
+    'videos': re.compile(r'data-url-video', re.IGNORECASE),
+}
+
+# Scanner de literais JS/JSON: âncoras do dataProduct e tokens relevantes para
+# achar o fim de um objeto (strings são consumidas inteiras, então chaves e
+# colchetes dentro delas não contam)
+DATA_PRODUCT_RE = re.compile(r'\bdataProduct\s*=\s*(?=\{)')
+JS_STRING_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|\'[^\'\\]*(?:\\.[^\'\\]*)*\'', re.DOTALL)
+JS_TOKEN_RE = re.compile(JS_STRING_RE.pattern + r'|[{}\[\]]', re.DOTALL)
+JS_KEY_RE = re.compile(r'[\s,]*(?:"([^"\\]*)"|\'([^\'\\]*)\'|([A-Za-z_$][\w$]*))\s*:\s*')
+JS_SCALAR_RE = re.compile(r'[^,}\]]*')
+TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+# Campos do dataProduct procurados na página quando o objeto não é reconhecível.
+# Começam pelo literal (busca rápida); a fronteira de palavra é conferida à parte
+JS_FIELD_RES = {key: re.compile(rf'{key}\s*:\s*(?=[{{\[])') for key in ('produto', 'breadcrumb', 'derivacao')}
+
+
+class ScanTimeout(Exception):
+    """Extração estourou o orçamento de tempo da página"""
+
+
+def _js_value_end(text: str, start: int, deadline: float) -> Optional[int]:
+    """Fim (exclusivo) do objeto/array JS que começa em text[start], ou None se não fecha"""
+    depth = 0
+    for count, token in enumerate(JS_TOKEN_RE.finditer(text, start)):
+        if count & 0xFF == 0 and time.monotonic() > deadline:
+            raise ScanTimeout()
+        char = token.group()[0]
+        if char in '{[':
+            depth += 1
+        elif char in '}]':
+            depth -= 1
+            if depth == 0:
+                return token.end()
+    return None
+
+
+def _js_object_fields(text: str, start: int, end: int, deadline: float) -> Dict[str, Tuple[int, int]]:
+    """Posições (início, fim) do valor de cada chave de primeiro nível de um objeto JS"""
+    fields = {}
+    pos = start + 1
+    while pos < end:
+        key = JS_KEY_RE.match(text, pos, end)
+        if not key:
+            break
+        value_start = key.end()
+        if value_start >= end:
+            break
+        if text[value_start] in '{[':
+            value_end = _js_value_end(text, value_start, deadline)
+        else:
+            value = JS_STRING_RE.match(text, value_start, end) or JS_SCALAR_RE.match(text, value_start, end)
+            value_end = value.end()
+        if value_end is None or value_end > end:
+            break
+        fields[key.group(1) or key.group(2) or key.group(3)] = (value_start, value_end)
+        pos = value_end
+    return fields
+
+
+def _loads_js_json(literal: str) -> Any:
+    """json.loads tolerando vírgula sobrando antes de } e ]; None se não for JSON"""
+    for candidate in (literal, TRAILING_COMMA_RE.sub(r'\1', literal)):
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            pass
+    return None
+
+
+def _has_class(name: str) -> str:
+    """Predicado XPath equivalente ao seletor CSS .name"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# Seletores do parse de produto: nome -> (CSS para BeautifulSoup, XPath equivalente para lxml).
+# Os dois lados são compilados uma vez por scraper e devem casar os mesmos elementos,
+# na mesma ordem de documento.
+SELECTORS = {
+    'name': (
+        'h1.product-name, h1[itemprop="name"], .product-title h1, h1',
+        f"//h1[{_has_class('product-name')}] | //h1[@itemprop='name'] | //*[{_has_class('product-title')}]//h1 | //h1",
+    ),
+    'sku': (
+        '.caract-referencia dd, [itemprop="sku"], .product-sku',
+        f"//*[{_has_class('caract-referencia')}]//dd | //*[@itemprop='sku'] | //*[{_has_class('product-sku')}]",
+    ),
+    'price_meta': (
+        'meta[property="product:price:amount"], meta[property="og:price:amount"]',
+        "//meta[@property='product:price:amount' or @property='og:price:amount']",
+    ),
+    'brand': (
+        '[itemprop="brand"], .product-brand, .marca',
+        f"//*[@itemprop='brand' or {_has_class('product-brand')} or {_has_class('marca')}]",
+    ),
+    'gallery_thumbs': (
+        '.gallery-thumbs .swiper-slide a[data-img-full]',
+        f"//*[{_has_class('gallery-thumbs')}]//*[{_has_class('swiper-slide')}]//a[@data-img-full]",
+    ),
+    'gallery_main_full': (
+        '.gallery-main .swiper-slide img[data-img-full]',
+        f"//*[{_has_class('gallery-main')}]//*[{_has_class('swiper-slide')}]//img[@data-img-full]",
+    ),
+    'gallery_main_max': (
+        '.gallery-main .swiper-slide img[data-src-max]',
+        f"//*[{_has_class('gallery-main')}]//*[{_has_class('swiper-slide')}]//img[@data-src-max]",
+    ),
+    'og_image': (
+        'meta[property="og:image"]',
+        "//meta[@property='og:image']",
+    ),
+    'images_generic': (
+        '[itemprop="image"], .product-image img, .gallery-image img',
+        f"//*[@itemprop='image'] | //*[{_has_class('product-image')}]//img | //*[{_has_class('gallery-image')}]//img",
+    ),
+    'description': (
+        '#descricao-produto .content, .descricao-produto .content, [itemprop="description"]',
+        f"//*[@id='descricao-produto']//*[{_has_class('content')}]"
+        f" | //*[{_has_class('descricao-produto')}]//*[{_has_class('content')}] | //*[@itemprop='description']",
+    ),
+    'meta_description': (
+        'meta[name="description"]',
+        "//meta[@name='description']",
+    ),
+    'breadcrumb': (
+        '.breadcrumb a, .breadcrumbs a, nav[aria-label="breadcrumb"] a',
+        f"//*[{_has_class('breadcrumb')}]//a | //*[{_has_class('breadcrumbs')}]//a | //nav[@aria-label='breadcrumb']//a",
+    ),
+    'specs': (
+        '#caracteristicas .grupo-carac, #caracteristicas dl, .caracteristicas-produto',
+        f"//*[@id='caracteristicas']//*[{_has_class('grupo-carac')}] | //*[@id='caracteristicas']//dl"
+        f" | //*[{_has_class('caracteristicas-produto')}]",
+    ),
+    'spec_terms': ('dt', './/dt'),
+    'spec_values': ('dd', './/dd'),
+    'datasheet': (
+        'a[href*="datasheet"], a[href*="manual"], a[href$=".pdf"]',
+        "//a[contains(@href, 'datasheet') or contains(@href, 'manual')"
+        " or substring(@href, string-length(@href) - 3) = '.pdf']",
+    ),
+    'warranty': (
+        '.garantia, [class*="warranty"], [class*="garantia"]',
+        f"//*[{_has_class('garantia')} or contains(@class, 'warranty') or contains(@class, 'garantia')]",
+    ),
+    'videos': (
+        '.video-mini[data-url-video]',
+        f"//*[{_has_class('video-mini')}][@data-url-video]",
+    ),
+}
+
+
+class SoupDocument:
+    """Página montada com BeautifulSoup (html.parser) e seletores CSS pré-compilados"""
+
+    def __init__(self, html_content: str, selectors: Dict[str, Any]):
+        self.root = BeautifulSoup(html_content, 'html.parser')
+        self.selectors = selectors
+
+    def first(self, key: str, el=None):
+        return self.selectors[key].select_one(self.root if el is None else el)
+
+    def all(self, key: str, el=None) -> list:
+        return self.selectors[key].select(self.root if el is None else el)
+
+    @staticmethod
+    def text(el) -> str:
+        return el.get_text(strip=True)
+
+    @staticmethod
+    def attr(el, name: str, default=None):
+        return el.get(name, default)
+
+
+class LxmlDocument:
+    """Página montada com lxml e XPath pré-compilado; mesma interface de SoupDocument"""
+
+    # Conteúdo que BeautifulSoup.get_text() não inclui
+    SKIP_TEXT = ('script', 'style', 'template')
+    _utf8_parser = lxml.html.HTMLParser(encoding='utf-8')
+
+    def __init__(self, html_content: str, selectors: Dict[str, Any]):
+        try:
+            self.root = lxml.html.document_fromstring(html_content)
+        except ValueError:
+            # Strings com declaração de encoding precisam ir como bytes
+            self.root = lxml.html.document_fromstring(html_content.encode('utf-8'), parser=self._utf8_parser)
+        self.selectors = selectors
+
+    def first(self, key: str, el=None):
+        found = self.selectors[key](self.root if el is None else el)
+        return found[0] if found else None
+
+    def all(self, key: str, el=None) -> list:
+        return self.selectors[key](self.root if el is None else el)
+
+    @classmethod
+    def text(cls, el) -> str:
+        """Equivalente a get_text(strip=True): cada trecho de texto sem espaços nas pontas, concatenados"""
+        parts = []
+
+        def walk(node):
+            if node.text:
+                parts.append(node.text.strip())
+            for child in node:
+                # Comentários têm tag não-string; o tail deles é texto normal
+                if isinstance(child.tag, str) and child.tag not in cls.SKIP_TEXT:
+                    walk(child)
+                if child.tail:
+                    parts.append(child.tail.strip())
+
+        walk(el)
+        return ''.join(parts)
+
+    @staticmethod
+    def attr(el, name: str, default=None):
+        return el.get(name, default)
+
+
+PARSER_ENGINES = {
+    'soup': (SoupDocument, lambda css, xpath: soupsieve.compile(css)),
+    'lxml': (LxmlDocument, lambda css, xpath: lxml.etree.XPath(xpath)),
+}
+
+
+# Atributos normalizados (ver normalize_attributes): regex por unidade e as chaves de
+# specs que podem trazer o valor quando ele não aparece no nome
+UNIT_ATTRIBUTES = {
+    'voltage_v': (re.compile(r'(\d+)\s*v(?:ac|dc|ca|cc)?\b', re.IGNORECASE), ('tensão', 'tensao', 'voltagem')),
+    'power_w': (re.compile(r'(\d+(?:[.,]\d+)?)\s*(kw|w)\b', re.IGNORECASE), ('potência', 'potencia')),
+    'power_va': (re.compile(r'(\d+(?:[.,]\d+)?)\s*(kva|va)\b', re.IGNORECASE), ('potência', 'potencia')),
+    'section_mm2': (re.compile(r'(\d+(?:[.,]\d+)?)\s*mm(?:²|2\b)', re.IGNORECASE), ('seção', 'secao', 'bitola')),
+    'length_m': (re.compile(r'(\d+(?:[.,]\d+)?)\s*(?:metros?|m)\b', re.IGNORECASE), ('comprimento',)),
+}
+
+
+def _unit_number(text: str, multiplier: int = 1):
+    """'2,5' -> 2.5; valores inteiros viram int (JSON mais limpo)"""
+    value = float(text.replace(',', '.')) * multiplier
+    return int(value) if value.is_integer() else value
+
+
+def normalize_attributes(name: str, specs: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Extrai tensão (V), potência (W/VA), seção (mm²) e comprimento (m) do nome e das specs
+
+    O nome tem prioridade; specs só completam o que o nome não traz.
+    """
+    attributes = {}
+    for key, (pattern, spec_keys) in UNIT_ATTRIBUTES.items():
+        sources = [name or '']
+        sources += [value for spec_key, value in (specs or {}).items()
+                    if any(k in spec_key.lower() for k in spec_keys)]
+        for text in sources:
+            match = pattern.search(text)
+            if match:
+                multiplier = 1000 if match.lastindex == 2 and match.group(2).lower().startswith('k') else 1
+                attributes[key] = _unit_number(match.group(1), multiplier)
+                break
+    return attributes
+
+
+# Grupos de campos com hash próprio: o change set de cada produto diz quais grupos mudaram
+FIELD_GROUPS = {
+    'pricing': ('price', 'priceFormatted', 'pricePix'),
+    'stock': ('inStock', 'stock'),
+    'media': ('image', 'images', 'videos', 'datasheet'),
+    'text': ('name', 'description', 'specs', 'warranty', 'attributes'),
+    'taxonomy': ('brand', 'category', 'categoryPath'),
+    'identity': ('id', 'sku', 'slug', 'sourceUrl', 'supplier', 'gtin', 'weight_kg', 'dimensions_cm'),
+}
+
+
+def canonical_hash(data: Any) -> str:
+    """blake2b (128 bits) do JSON canônico: chaves ordenadas, sem espaços"""
+    canonical = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+
 @dataclass
 class Product:
     """Estrutura de dados do produto"""
@@ -100,6 +423,13 @@ class Product:
     gtin: Optional[str] = None
     weight_kg: Optional[float] = None
     dimensions_cm: Optional[Dict[str, float]] = None
+    # Atributos normalizados: voltage_v, power_w, power_va, section_mm2, length_m
+    attributes: Optional[Dict[str, float]] = None
+
+    def __post_init__(self):
+        # Calculados uma vez no scrape (e para payloads em cache anteriores ao campo)
+        if self.attributes is None:
+            self.attributes = normalize_attributes(self.name, self.specs) or None
 
     def to_dict(self) -> dict:
         """Converte para dicionário, removendo None"""
@@ -107,23 +437,158 @@ class Product:
         # Remover campos None para JSON mais limpo
         return {k: v for k, v in d.items() if v is not None}
 
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Product':
+        """Reconstrói o produto a partir de to_dict() (ex: payload em cache)"""
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
     def content_hash(self) -> str:
-        """Gera hash do conteúdo para detectar mudanças"""
-        content = f"{self.name}|{self.price}|{self.inStock}|{self.description or ''}"
-        return hashlib.md5(content.encode()).hexdigest()
+        """Hash de todos os campos, para detectar mudanças"""
+        return canonical_hash(self.to_dict())
+
+    def group_hashes(self) -> Dict[str, str]:
+        """Hash de cada grupo de FIELD_GROUPS"""
+        data = self.to_dict()
+        return {group: canonical_hash({key: data[key] for key in keys if key in data})
+                for group, keys in FIELD_GROUPS.items()}
+
+
+class NotModified(Exception):
+    """Servidor respondeu 304 a um GET condicional: vale o produto em cache"""
+
+
+class FetchError(Exception):
+    """Página não baixou (timeout/erro HTTP em todas as tentativas)"""
 
 
 class ProductsDB:
-    """Banco SQLite para tracking de produtos e progresso"""
+    """Banco SQLite para tracking de produtos e progresso
+
+    Cada thread usa uma conexão própria, aberta uma vez e reaproveitada, com
+    o banco em modo WAL: leituras não bloqueiam a escrita e escritas
+    concorrentes esperam pelo lock do próprio SQLite (busy timeout), sem um
+    lock global serializando todas as chamadas.
+
+    As escritas por URL do crawl (cache do produto, status, validadores) vão
+    para uma fila e uma thread writer grava em transações agrupadas. Um lote
+    entra inteiro ou não entra: se o processo morrer antes do commit, as URLs
+    do lote continuam 'pending' e o --resume as refaz.
+    """
+
+    BUSY_TIMEOUT = 30.0  # Segundos esperando outra conexão liberar a escrita
+    WRITE_BATCH_ROWS = 500  # Escritas por transação do writer
+    WRITE_BATCH_INTERVAL = 0.2  # Segundos máximos que uma escrita espera na fila
 
     def __init__(self, db_path: Path = DB_FILE):
         self.db_path = db_path
-        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        # Fila limitada: se o disco não acompanha, os workers esperam em vez de acumular memória
+        self._writes: queue.Queue = queue.Queue(maxsize=self.WRITE_BATCH_ROWS * 20)
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+        # (content_hash, hashes por grupo) por fornecedor e SKU, carregados por load_content_hashes
+        self._content_hashes: Dict[str, Dict[str, Tuple[str, Dict[str, str]]]] = {}
         self._init_db()
 
+    def _connect(self) -> sqlite3.Connection:
+        # check_same_thread=False só para close() poder fechar tudo da thread principal;
+        # no uso normal cada conexão fica na sua thread
+        conn = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT,
+                               check_same_thread=False, cached_statements=256)
+        # WAL: fsync no checkpoint, não a cada commit
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        """Conexão persistente da thread atual"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _enqueue(self, sql: str, params: tuple):
+        """Agenda uma escrita para o writer (a thread sobe no primeiro uso)"""
+        # Subir só quando há escrita mantém o main sem threads até o fork do pool de parse
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name='db-writer', daemon=True)
+                    self._writer.start()
+        self._writes.put((sql, params))
+
+    def _write_loop(self):
+        """Thread writer: junta escritas por até WRITE_BATCH_ROWS linhas ou WRITE_BATCH_INTERVAL segundos"""
+        conn = self._conn()
+        while True:
+            rows = []
+            markers = []
+            item = self._writes.get()
+            deadline = time.monotonic() + self.WRITE_BATCH_INTERVAL
+            while True:
+                if not isinstance(item, tuple):
+                    # flush() (Event) ou parada (None): grava o que já chegou antes dele
+                    markers.append(item)
+                    break
+                rows.append(item)
+                remaining = deadline - time.monotonic()
+                if len(rows) >= self.WRITE_BATCH_ROWS or remaining <= 0:
+                    break
+                try:
+                    item = self._writes.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            if rows:
+                self._commit_rows(conn, rows)
+            for marker in markers:
+                if marker is None:
+                    return
+                marker.set()
+
+    def _commit_rows(self, conn: sqlite3.Connection, rows: List[tuple]):
+        """Grava um lote em uma transação, com executemany por sequência do mesmo comando"""
+        try:
+            with conn:
+                for sql, group in itertools.groupby(rows, key=lambda row: row[0]):
+                    conn.executemany(sql, [params for _, params in group])
+        except sqlite3.Error as e:
+            logger.error(f"Banco: lote de {len(rows)} escritas descartado ({e}); "
+                         f"as URLs dele continuam pendentes para o --resume")
+
+    def flush(self):
+        """Espera o writer gravar tudo o que já está na fila"""
+        if self._writer is None or not self._writer.is_alive():
+            return
+        done = threading.Event()
+        self._writes.put(done)
+        done.wait()
+
+    def close(self):
+        """Grava a fila e fecha todas as conexões (a última faz o checkpoint do WAL no arquivo principal)"""
+        if self._writer is not None:
+            if self._writer.is_alive():
+                self._writes.put(None)
+                self._writer.join()
+            self._writer = None
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
     def _init_db(self):
         """Cria tabelas se não existirem"""
-        with sqlite3.connect(self.db_path) as conn:
+        # Conexão avulsa, fechada no fim: nada aberto é herdado pelo fork do pool de parse
+        conn = self._connect()
+        # journal_mode fica gravado no arquivo do banco
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS products_cache (
                     id TEXT PRIMARY KEY,
@@ -133,18 +598,41 @@ class ProductsDB:
                     content_hash TEXT,
                     last_scraped TEXT,
                     source_url TEXT,
+                    payload TEXT,
                     UNIQUE(supplier, sku)
                 )
             """)
+            # Bancos antigos não têm a coluna payload (produto completo em JSON)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(products_cache)")}
+            if 'payload' not in columns:
+                conn.execute("ALTER TABLE products_cache ADD COLUMN payload TEXT")
+            # Hashes por grupo de campos (JSON), base dos change sets
+            if 'group_hashes' not in columns:
+                conn.execute("ALTER TABLE products_cache ADD COLUMN group_hashes TEXT")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS http_validators (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    updated_at TEXT
+                )
+            """)
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS urls_progress (
                     url TEXT PRIMARY KEY,
                     supplier TEXT NOT NULL,
                     status TEXT DEFAULT 'pending',
                     processed_at TEXT,
-                    result TEXT
+                    result TEXT,
+                    lastmod TEXT
                 )
             """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(urls_progress)")}
+            if 'lastmod' not in columns:
+                conn.execute("ALTER TABLE urls_progress ADD COLUMN lastmod TEXT")
+            # Presença no sitemap da leitura atual (as ausentes viram 'discontinued' no fim)
+            if 'in_sitemap' not in columns:
+                conn.execute("ALTER TABLE urls_progress ADD COLUMN in_sitemap INTEGER NOT NULL DEFAULT 1")
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS scrape_runs (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -158,142 +646,554 @@ class ProductsDB:
             """)
             conn.execute("CREATE INDEX IF NOT EXISTS idx_urls_supplier ON urls_progress(supplier)")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_urls_status ON urls_progress(status)")
-            conn.commit()
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS html_cache (
+                    url TEXT PRIMARY KEY,
+                    supplier TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    fetched_at TEXT,
+                    headers TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_source_url ON products_cache(source_url)")
+            # Uma linha por URL: o produto gravado por último substitui os de outro id
+            conn.execute("""
+                CREATE TRIGGER IF NOT EXISTS products_cache_one_per_url
+                AFTER INSERT ON products_cache
+                BEGIN
+                    DELETE FROM products_cache
+                    WHERE source_url = NEW.source_url AND supplier = NEW.supplier AND id != NEW.id;
+                END
+            """)
+            # Bancos anteriores ao trigger podem ter linhas velhas da URL: fica a mais recente
+            conn.execute("""
+                DELETE FROM products_cache WHERE EXISTS (
+                    SELECT 1 FROM products_cache newer
+                    WHERE newer.supplier = products_cache.supplier
+                      AND newer.source_url = products_cache.source_url
+                      AND newer.last_scraped > products_cache.last_scraped
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_html_cache_supplier ON html_cache(supplier)")
+        conn.close()
 
     def get_cached_product(self, supplier: str, sku: str) -> Optional[dict]:
         """Retorna produto em cache se existir"""
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                row = conn.execute(
-                    "SELECT * FROM products_cache WHERE supplier = ? AND sku = ?",
-                    (supplier, sku)
-                ).fetchone()
-                return dict(row) if row else None
+        cursor = self._conn().execute(
+            "SELECT * FROM products_cache WHERE supplier = ? AND sku = ?",
+            (supplier, sku)
+        )
+        row = cursor.fetchone()
+        return dict(zip([column[0] for column in cursor.description], row)) if row else None
+
+    def get_cached_product_by_url(self, url: str) -> Optional[Product]:
+        """Retorna o produto completo em cache para uma URL (se houver payload)"""
+        row = self._conn().execute("""
+            SELECT payload FROM products_cache WHERE source_url = ? AND payload IS NOT NULL
+            ORDER BY last_scraped DESC LIMIT 1
+        """, (url,)).fetchone()
+        return Product.from_dict(json.loads(row[0])) if row else None
+
+    def get_carried_products(self, supplier: str, min_price: float) -> List[Product]:
+        """Produtos em cache das URLs ativas cujo último resultado foi um produto válido
+
+        Base do products.json quando a execução não devolve o catálogo inteiro
+        (incremental, --resume): o que não mudou vem do payload salvo. No
+        máximo um produto por URL, o gravado por último.
+        """
+        rows = self._conn().execute("""
+            SELECT payload FROM (
+                SELECT c.payload, c.price,
+                       ROW_NUMBER() OVER (PARTITION BY u.url ORDER BY c.last_scraped DESC) AS position
+                FROM urls_progress u
+                JOIN products_cache c ON c.source_url = u.url
+                WHERE u.supplier = ? AND u.status = 'done'
+                  AND u.result IN ('ok', 'unchanged', 'not_modified', 'lastmod_unchanged')
+                  AND c.payload IS NOT NULL
+            )
+            WHERE position = 1 AND price >= ?
+        """, (supplier, min_price)).fetchall()
+        return [Product.from_dict(json.loads(r[0])) for r in rows]
 
     def update_product_cache(self, product: Product):
-        """Atualiza cache do produto"""
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute("""
-                    INSERT OR REPLACE INTO products_cache
-                    (id, supplier, sku, price, content_hash, last_scraped, source_url)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    product.id,
-                    product.supplier,
-                    product.sku,
-                    product.price,
-                    product.content_hash(),
-                    datetime.now(timezone.utc).isoformat(),
-                    product.sourceUrl
-                ))
-                conn.commit()
+        """Atualiza cache do produto (via writer)
+
+        O trigger products_cache_one_per_url apaga, na mesma transação, as
+        linhas da URL com outro id (SKU trocado no fornecedor).
+        """
+        content_hash = product.content_hash()
+        group_hashes = product.group_hashes()
+        hashes = self._content_hashes.get(product.supplier)
+        if hashes is not None:
+            hashes[product.sku] = (content_hash, group_hashes)
+        self._enqueue("""
+            INSERT OR REPLACE INTO products_cache
+            (id, supplier, sku, price, content_hash, last_scraped, source_url, payload, group_hashes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            product.id,
+            product.supplier,
+            product.sku,
+            product.price,
+            content_hash,
+            datetime.now(timezone.utc).isoformat(),
+            product.sourceUrl,
+            json.dumps(product.to_dict(), ensure_ascii=False),
+            json.dumps(group_hashes)
+        ))
+
+    def get_validators(self, url: str) -> Optional[dict]:
+        """Retorna ETag/Last-Modified da URL, só se houver produto em cache para reaproveitar"""
+        row = self._conn().execute("""
+            SELECT v.etag, v.last_modified FROM http_validators v
+            JOIN products_cache c ON c.source_url = v.url
+            WHERE v.url = ? AND c.payload IS NOT NULL
+        """, (url,)).fetchone()
+        return {'etag': row[0], 'last_modified': row[1]} if row else None
+
+    def save_validators(self, url: str, etag: Optional[str], last_modified: Optional[str]):
+        """Guarda ETag/Last-Modified da última resposta 200 da URL (via writer)"""
+        self._enqueue("""
+            INSERT OR REPLACE INTO http_validators (url, etag, last_modified, updated_at)
+            VALUES (?, ?, ?, ?)
+        """, (url, etag, last_modified, datetime.now(timezone.utc).isoformat()))
+
+    def load_content_hashes(self, supplier: str):
+        """Carrega em memória os hashes de todos os produtos do fornecedor (uma consulta)
+
+        A partir daqui product_changes responde pelo mapa, que update_product_cache mantém em dia.
+        """
+        rows = self._conn().execute(
+            "SELECT sku, content_hash, group_hashes FROM products_cache WHERE supplier = ?",
+            (supplier,)
+        ).fetchall()
+        self._content_hashes[supplier] = {
+            sku: (content_hash, json.loads(group_hashes) if group_hashes else {})
+            for sku, content_hash, group_hashes in rows
+        }
+
+    def product_changes(self, product: Product) -> Optional[List[str]]:
+        """Grupos de campos que mudaram desde o último scrape ([] = nada; None = produto novo)"""
+        hashes = self._content_hashes.get(product.supplier)
+        if hashes is not None:
+            cached = hashes.get(product.sku)
+        else:
+            row = self.get_cached_product(product.supplier, product.sku)
+            cached = row and (row['content_hash'], json.loads(row['group_hashes'] or '{}'))
+        if not cached:
+            return None
+        content_hash, group_hashes = cached
+        if content_hash == product.content_hash():
+            return []
+        # Registros sem hashes por grupo (anteriores ao campo) contam como mudança em todos
+        return [group for group, digest in product.group_hashes().items() if group_hashes.get(group) != digest]
 
     def product_changed(self, product: Product) -> bool:
         """Verifica se produto mudou desde última execução"""
-        cached = self.get_cached_product(product.supplier, product.sku)
-        if not cached:
-            return True  # Produto novo
-        return cached.get('content_hash') != product.content_hash()
+        return self.product_changes(product) != []
 
-    def register_urls(self, urls: List[str], supplier: str):
-        """Registra URLs para processar"""
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
-                for url in urls:
-                    conn.execute("""
-                        INSERT OR IGNORE INTO urls_progress (url, supplier, status)
-                        VALUES (?, ?, 'pending')
-                    """, (url, supplier))
-                conn.commit()
+    def begin_url_sync(self, supplier: str) -> set:
+        """Início de uma leitura do sitemap: retorna as URLs ativas até aqui e zera a presença de todas
+
+        O histórico (processed_at/result) é mantido; register_urls marca as
+        URLs que continuam no sitemap e discontinue_missing_urls fecha o diff.
+        """
+        conn = self._conn()
+        with conn:
+            previous = {r[0] for r in conn.execute(
+                "SELECT url FROM urls_progress WHERE supplier = ? AND status != 'discontinued'",
+                (supplier,)
+            )}
+            conn.execute("UPDATE urls_progress SET in_sitemap = 0 WHERE supplier = ?", (supplier,))
+        return previous
+
+    def register_urls(self, urls: List[str], supplier: str, lastmods: Optional[Dict[str, str]] = None):
+        """Registra um lote de URLs do sitemap como pendentes nesta execução (com o lastmod, se houver)
+
+        URLs já conhecidas mantêm processed_at/result da execução anterior.
+        """
+        lastmods = lastmods or {}
+        conn = self._conn()
+        with conn:
+            conn.executemany("""
+                INSERT INTO urls_progress (url, supplier, status, lastmod, in_sitemap)
+                VALUES (?, ?, 'pending', ?, 1)
+                ON CONFLICT(url) DO UPDATE SET
+                    supplier = excluded.supplier, status = 'pending',
+                    lastmod = excluded.lastmod, in_sitemap = 1
+            """, [(url, supplier, lastmods.get(url)) for url in urls])
+
+    def discontinue_missing_urls(self, supplier: str) -> int:
+        """Marca como 'discontinued' as URLs que saíram do sitemap (sem baixá-las); retorna quantas"""
+        conn = self._conn()
+        with conn:
+            return conn.execute("""
+                UPDATE urls_progress SET status = 'discontinued'
+                WHERE supplier = ? AND in_sitemap = 0 AND status != 'discontinued'
+            """, (supplier,)).rowcount
+
+    def get_url_history(self, supplier: str) -> Dict[str, dict]:
+        """Retorna status, resultado e data do último processamento de cada URL"""
+        rows = self._conn().execute(
+            "SELECT url, status, processed_at, result FROM urls_progress WHERE supplier = ?",
+            (supplier,)
+        ).fetchall()
+        return {r[0]: {'status': r[1], 'processed_at': r[2], 'result': r[3]} for r in rows}
+
+    def mark_urls_done(self, results: List[Tuple[str, str]]):
+        """Marca várias URLs como processadas em uma única transação"""
+        now = datetime.now(timezone.utc).isoformat()
+        conn = self._conn()
+        with conn:
+            conn.executemany("""
+                UPDATE urls_progress SET status = 'done', processed_at = ?, result = ?
+                WHERE url = ?
+            """, [(now, result, url) for url, result in results])
 
     def get_pending_urls(self, supplier: str) -> List[str]:
         """Retorna URLs pendentes de processamento"""
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
-                rows = conn.execute(
-                    "SELECT url FROM urls_progress WHERE supplier = ? AND status = 'pending'",
-                    (supplier,)
-                ).fetchall()
-                return [r[0] for r in rows]
+        rows = self._conn().execute(
+            "SELECT url FROM urls_progress WHERE supplier = ? AND status = 'pending'",
+            (supplier,)
+        ).fetchall()
+        return [r[0] for r in rows]
 
     def get_all_urls(self, supplier: str) -> List[str]:
-        """Retorna todas as URLs registradas para o fornecedor"""
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
-                rows = conn.execute(
-                    "SELECT url FROM urls_progress WHERE supplier = ?",
-                    (supplier,)
-                ).fetchall()
-                return [r[0] for r in rows]
+        """Retorna as URLs registradas para o fornecedor (sem as descontinuadas)"""
+        rows = self._conn().execute(
+            "SELECT url FROM urls_progress WHERE supplier = ? AND status != 'discontinued'",
+            (supplier,)
+        ).fetchall()
+        return [r[0] for r in rows]
 
     def mark_url_done(self, url: str, result: str = 'ok'):
-        """Marca URL como processada"""
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute("""
-                    UPDATE urls_progress SET status = 'done', processed_at = ?, result = ?
-                    WHERE url = ?
-                """, (datetime.now(timezone.utc).isoformat(), result, url))
-                conn.commit()
+        """Marca URL como processada (via writer, no mesmo lote do cache do produto)"""
+        self._enqueue("""
+            UPDATE urls_progress SET status = 'done', processed_at = ?, result = ?
+            WHERE url = ?
+        """, (datetime.now(timezone.utc).isoformat(), result, url))
 
     def mark_url_error(self, url: str, error: str):
-        """Marca URL com erro"""
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute("""
-                    UPDATE urls_progress SET status = 'error', processed_at = ?, result = ?
-                    WHERE url = ?
-                """, (datetime.now(timezone.utc).isoformat(), error[:500], url))
-                conn.commit()
+        """Marca URL com erro (via writer)"""
+        self._enqueue("""
+            UPDATE urls_progress SET status = 'error', processed_at = ?, result = ?
+            WHERE url = ?
+        """, (datetime.now(timezone.utc).isoformat(), error[:500], url))
 
     def reset_urls(self, supplier: str):
         """Reseta progresso de URLs para um fornecedor"""
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute("DELETE FROM urls_progress WHERE supplier = ?", (supplier,))
-                conn.commit()
+        # Marcações ainda na fila não podem cair depois do DELETE
+        self.flush()
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM urls_progress WHERE supplier = ?", (supplier,))
+
+    def save_html_cache_entry(self, url: str, supplier: str, content_hash: str, headers: dict):
+        """Indexa a página bruta salva no HtmlCache (URL -> hash do conteúdo, via writer)"""
+        self._enqueue("""
+            INSERT OR REPLACE INTO html_cache (url, supplier, content_hash, fetched_at, headers)
+            VALUES (?, ?, ?, ?, ?)
+        """, (
+            url, supplier, content_hash,
+            datetime.now(timezone.utc).isoformat(),
+            json.dumps(headers, ensure_ascii=False)
+        ))
+
+    def get_html_cache_entries(self, supplier: str) -> List[tuple]:
+        """Retorna (url, content_hash) das páginas em cache do fornecedor (sem as descontinuadas)"""
+        return self._conn().execute("""
+            SELECT h.url, h.content_hash FROM html_cache h
+            LEFT JOIN urls_progress u ON u.url = h.url
+            WHERE h.supplier = ? AND COALESCE(u.status, '') != 'discontinued'
+            ORDER BY h.url
+        """, (supplier,)).fetchall()
+
+    def get_html_cache_hashes(self) -> set:
+        """Retorna todos os hashes referenciados pelo índice do HtmlCache"""
+        return {r[0] for r in self._conn().execute("SELECT DISTINCT content_hash FROM html_cache")}
 
     def get_progress(self, supplier: str) -> dict:
         """Retorna estatísticas de progresso"""
-        with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
-                total = conn.execute(
-                    "SELECT COUNT(*) FROM urls_progress WHERE supplier = ?", (supplier,)
-                ).fetchone()[0]
-                done = conn.execute(
-                    "SELECT COUNT(*) FROM urls_progress WHERE supplier = ? AND status = 'done'", (supplier,)
-                ).fetchone()[0]
-                errors = conn.execute(
-                    "SELECT COUNT(*) FROM urls_progress WHERE supplier = ? AND status = 'error'", (supplier,)
-                ).fetchone()[0]
-                return {'total': total, 'done': done, 'errors': errors, 'pending': total - done - errors}
+        total, done, errors, discontinued = self._conn().execute("""
+            SELECT COALESCE(SUM(status != 'discontinued'), 0),
+                   COALESCE(SUM(status = 'done'), 0),
+                   COALESCE(SUM(status = 'error'), 0),
+                   COALESCE(SUM(status = 'discontinued'), 0)
+            FROM urls_progress WHERE supplier = ?
+        """, (supplier,)).fetchone()
+        return {'total': total, 'done': done, 'errors': errors, 'pending': total - done - errors,
+                'discontinued': discontinued}
 
     def log_run(self, supplier: str, found: int, new: int, updated: int):
         """Registra execução do scraper"""
+        conn = self._conn()
+        with conn:
+            conn.execute("""
+                INSERT INTO scrape_runs
+                (supplier, started_at, finished_at, products_found, products_new, products_updated)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (
+                supplier,
+                datetime.now(timezone.utc).isoformat(),
+                datetime.now(timezone.utc).isoformat(),
+                found, new, updated
+            ))
+
+
+class HtmlCache:
+    """Cache em disco do HTML bruto, comprimido e endereçado por conteúdo
+
+    Cada página vira html_cache/ab/<sha256>.html.gz; o índice URL -> hash
+    (com data do fetch e headers da resposta) fica na tabela html_cache do
+    ProductsDB. Páginas idênticas ocupam um único arquivo.
+    """
+
+    def __init__(self, root: Path = HTML_CACHE_DIR):
+        self.root = root
+
+    def _path(self, content_hash: str) -> Path:
+        return self.root / content_hash[:2] / f"{content_hash}.html.gz"
+
+    def put(self, html_content: str) -> str:
+        """Salva o HTML (se ainda não existir) e retorna o hash do conteúdo"""
+        data = html_content.encode('utf-8')
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self._path(content_hash)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Escrita atômica: threads concorrentes nunca leem arquivo pela metade
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(gzip.compress(data, compresslevel=6))
+            os.replace(tmp, path)
+        return content_hash
+
+    def get(self, content_hash: str) -> Optional[str]:
+        """Lê o HTML pelo hash"""
+        try:
+            return gzip.decompress(self._path(content_hash).read_bytes()).decode('utf-8')
+        except FileNotFoundError:
+            return None
+
+    def prune(self, keep: set) -> int:
+        """Remove arquivos não referenciados pelo índice; retorna quantos removeu"""
+        removed = 0
+        for path in self.root.glob('*/*.html.gz'):
+            if path.name[:-len('.html.gz')] not in keep:
+                path.unlink()
+                removed += 1
+        return removed
+
+
+class HostRateLimiter:
+    """Pacing global por host (token bucket compartilhado entre threads e engines)
+
+    Cada host tem um budget de requests/segundo. Respostas 429/503 com
+    Retry-After bloqueiam o host até o prazo pedido, e erros reduzem o ritmo pela metade
+    (no máximo uma vez por segundo); sucessos recuperam o ritmo aos poucos.
+    """
+
+    MIN_RATE = 0.2  # Piso em requests/segundo ao desacelerar
+    DEFAULT_RATE = 2.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, dict] = {}
+
+    def configure(self, host: str, rate: float):
+        """Define o budget (requests/segundo) de um host"""
         with self._lock:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute("""
-                    INSERT INTO scrape_runs
-                    (supplier, started_at, finished_at, products_found, products_new, products_updated)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    supplier,
-                    datetime.now(timezone.utc).isoformat(),
-                    datetime.now(timezone.utc).isoformat(),
-                    found, new, updated
-                ))
-                conn.commit()
+            state = self._state(host)
+            state['max_rate'] = rate
+            state['rate'] = rate
+
+    def _state(self, host: str) -> dict:
+        state = self._hosts.get(host)
+        if state is None:
+            state = {
+                'max_rate': self.DEFAULT_RATE,
+                'rate': self.DEFAULT_RATE,
+                'tokens': 1.0,
+                'updated': time.monotonic(),
+                'blocked_until': 0.0,
+                'last_slowdown': 0.0,
+            }
+            self._hosts[host] = state
+        return state
+
+    def reserve(self, host: str) -> float:
+        """Reserva um request e retorna quantos segundos esperar antes de enviá-lo"""
+        with self._lock:
+            state = self._state(host)
+            now = time.monotonic()
+            # Durante um Retry-After o bucket só volta a encher quando o bloqueio acaba
+            start = max(now, state['blocked_until'])
+            # Burst de até 1 segundo de budget
+            burst = max(1.0, state['rate'])
+            state['tokens'] = min(burst, state['tokens'] + (start - state['updated']) * state['rate'])
+            state['updated'] = start
+            state['tokens'] -= 1
+            if state['tokens'] >= 0:
+                return start - now
+            return start - now - state['tokens'] / state['rate']
+
+    def wait(self, host: str):
+        """Bloqueia a thread até o request poder ser enviado"""
+        delay = self.reserve(host)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self, host: str):
+        """Versão asyncio de wait()"""
+        delay = self.reserve(host)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def feedback(self, host: str, status: Optional[int], retry_after: Optional[str] = None):
+        """Ajusta o ritmo do host conforme a resposta (status None = erro de conexão)"""
+        with self._lock:
+            state = self._state(host)
+            now = time.monotonic()
+
+            if status is not None and status < 400:
+                # Recuperação aditiva até o budget configurado
+                state['rate'] = min(state['max_rate'], state['rate'] + state['max_rate'] * 0.05)
+                return
+
+            if status in (429, 503) and retry_after:
+                wait = self._parse_retry_after(retry_after)
+                if wait and now + wait > state['blocked_until']:
+                    # Nenhum request para o host até o Retry-After expirar (prazo
+                    # absoluto: não depende do ritmo, que cai logo abaixo); reservas
+                    # anteriores já têm horário, então o bucket recomeça com 1 request
+                    state['blocked_until'] = now + wait
+                    state['tokens'] = 1.0
+                    state['updated'] = now + wait
+
+            if status is None or status in (429, 503) or status >= 500:
+                if now - state['last_slowdown'] >= 1.0:
+                    state['last_slowdown'] = now
+                    state['rate'] = max(self.MIN_RATE, state['rate'] / 2)
+                    logger.warning(f"Reduzindo ritmo para {host}: {state['rate']:.1f} req/s (status {status})")
+
+    @staticmethod
+    def _parse_retry_after(value: str) -> Optional[float]:
+        """Converte Retry-After (segundos ou data HTTP) em segundos"""
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+# Limiter compartilhado por todos os scrapers do processo
+RATE_LIMITER = HostRateLimiter()
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """Converte o <lastmod> do sitemap (W3C datetime) em datetime UTC
+
+    Datas sem horário valem até o fim do dia, para não pular páginas
+    alteradas no mesmo dia depois do último scrape.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        if len(value) == 10:
+            return datetime.fromisoformat(value).replace(tzinfo=timezone.utc) + timedelta(days=1)
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def iter_sitemap_xml(chunks: Iterable[bytes]) -> Iterator[Tuple[str, str, Optional[str]]]:
+    """Parse incremental de sitemap (urlset ou sitemapindex, opcionalmente gzip)
+
+    Gera (tipo, loc, lastmod) à medida que cada <url>/<sitemap> fecha, com
+    tipo 'url' ou 'sitemap'. Elementos já lidos são descartados, então a
+    memória não cresce com o tamanho do sitemap.
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    decompressor = None
+    root = None
+    first = True
+
+    def drain():
+        nonlocal root
+        for event, elem in parser.read_events():
+            if event == 'start':
+                if root is None:
+                    root = elem
+                continue
+            kind = elem.tag.rsplit('}', 1)[-1]
+            if kind not in ('url', 'sitemap'):
+                continue
+            loc = lastmod = None
+            # Só filhos diretos: <image:loc> fica dentro de <image:image>
+            for child in elem:
+                name = child.tag.rsplit('}', 1)[-1]
+                if name == 'loc':
+                    loc = (child.text or '').strip()
+                elif name == 'lastmod':
+                    lastmod = (child.text or '').strip() or None
+            root.clear()
+            if loc:
+                yield kind, loc, lastmod
+
+    for chunk in chunks:
+        if first and chunk:
+            # .xml.gz servido sem Content-Encoding: descomprimir aqui
+            if chunk[:2] == b'\x1f\x8b':
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            first = False
+        if decompressor:
+            chunk = decompressor.decompress(chunk)
+        parser.feed(chunk)
+        yield from drain()
+
+    if decompressor:
+        parser.feed(decompressor.flush())
+    parser.close()
+    yield from drain()
 
 
 class BaseScraper(ABC):
     """Classe base para scrapers de fornecedores"""
 
-    def __init__(self, min_price: float = 100.0, delay: float = 0.5, workers: int = 5):
+    URL_BATCH_SIZE = 200  # URLs do sitemap registradas no banco por vez
+
+    def __init__(self, min_price: float = 100.0, delay: float = 0.5, workers: int = 5,
+                 engine: str = 'threads', concurrency: int = 128, per_host: int = 32,
+                 rate_limiter: Optional[HostRateLimiter] = None, html_cache: Optional[HtmlCache] = None,
+                 parse_pool: Optional[ProcessPoolExecutor] = None):
         self.min_price = min_price
-        self.delay = delay
+        self.delay = delay  # Base do backoff entre tentativas
         self.workers = workers
+        # Engine de fetch: 'threads' (ThreadPoolExecutor) ou 'async' (asyncio + aiohttp)
+        self.engine = engine
+        self.concurrency = concurrency  # Requests em voo (engine async)
+        self.per_host = per_host        # Conexões simultâneas por host (engine async)
+        self.rate_limiter = rate_limiter or RATE_LIMITER
+        self.db: Optional[ProductsDB] = None  # Usado para GET condicional (ETag/Last-Modified)
+        self.html_cache = html_cache            # Cache do HTML bruto (None = desativado)
+        self.parse_pool = parse_pool            # Pool de processos de parse (None = parse na thread do fetch)
+        self.parse_stats = {'pages': 0, 'no_dom': 0}
+        # Change sets da última execução: {id, sku, supplier, sourceUrl, status, groups}
+        self.changes: List[dict] = []
+        # False se a última leitura do sitemap falhou no meio (URLs ausentes não são descontinuadas)
+        self.sitemap_complete = True
+        # Acertos de cada caminho de extração por campo: {campo: {caminho: acertos}}
+        self.path_hits: Dict[str, Dict[str, int]] = {}
+        self._stats_lock = threading.Lock()
         self._local = threading.local()
 
     def _get_session(self) -> requests.Session:
@@ -314,50 +1214,179 @@ class BaseScraper(ABC):
         """Retorna lista de URLs de produtos"""
         pass
 
+    def get_sitemap_entries(self) -> List[Tuple[str, Optional[str]]]:
+        """Retorna (url, lastmod) dos produtos; sem lastmod por padrão"""
+        return [(url, None) for url in self.get_product_urls()]
+
+    def iter_sitemap_entries(self) -> Iterator[Tuple[str, Optional[str]]]:
+        """Gera (url, lastmod) dos produtos; subclasses podem fazer streaming"""
+        return iter(self.get_sitemap_entries())
+
     @abstractmethod
-    def parse_product(self, url: str) -> Optional[Product]:
-        """Faz parse de uma página de produto"""
+    def parse_html(self, url: str, html_content: str) -> Optional[Product]:
+        """Faz parse do HTML já baixado de uma página de produto"""
         pass
 
-    def fetch(self, url: str, retries: int = 3) -> Optional[str]:
-        """Faz fetch de uma URL com retry"""
+    def parse_product(self, url: str, conditional: bool = False) -> Optional[Product]:
+        """Baixa e faz parse de uma página de produto
+
+        Com conditional=True levanta NotModified se a página não mudou.
+        Levanta FetchError se a página não baixou.
+        """
+        html_content = self.fetch(url, conditional=conditional)
+        if html_content is None:
+            raise FetchError(f"falha no download após as tentativas: {url}")
+        return self._parse_page(url, html_content)
+
+    def worker_spec(self) -> Optional[tuple]:
+        """Identifica o scraper para recriá-lo nos processos de parse (None = só parse local)"""
+        return None
+
+    def _parse_page(self, url: str, html_content: str) -> Optional[Product]:
+        """Faz o parse no pool de processos, se houver; senão na própria thread
+
+        A thread que chamou fica só esperando o resultado (sem segurar o GIL) e
+        segue com filtros e escrita no banco.
+        """
+        spec = self.worker_spec()
+        if self.parse_pool is None or spec is None:
+            return self.parse_html(url, html_content)
+        product, stats, path_hits = self.parse_pool.submit(_parse_in_worker, spec, url, html_content).result()
+        with self._stats_lock:
+            for key, value in stats.items():
+                self.parse_stats[key] += value
+            for field, counts in path_hits.items():
+                totals = self.path_hits.setdefault(field, {})
+                for path, hits in counts.items():
+                    totals[path] = totals.get(path, 0) + hits
+        return product
+
+    def _count_parse(self, no_dom: bool):
+        """Contabiliza páginas extraídas e quantas dispensaram o DOM"""
+        with self._stats_lock:
+            self.parse_stats['pages'] += 1
+            if no_dom:
+                self.parse_stats['no_dom'] += 1
+
+    def _first_hit(self, field: str, paths: Dict[str, Any]) -> Any:
+        """Valor do primeiro caminho de extração que acerta o campo
+
+        paths mapeia nome do caminho -> função sem argumentos, em ordem de
+        preferência. A ordem é sempre a mesma (caminhos diferentes dão valores
+        diferentes, e o resultado não pode depender das páginas vistas antes);
+        os acertos de cada caminho só são contados, para o resumo do crawl.
+        """
+        for path, extract in paths.items():
+            value = extract()
+            if value:
+                with self._stats_lock:
+                    counts = self.path_hits.setdefault(field, {})
+                    counts[path] = counts.get(path, 0) + 1
+                return value
+        return None
+
+    def _conditional_headers(self, url: str) -> dict:
+        """Headers If-None-Match/If-Modified-Since a partir dos validadores salvos"""
+        validators = self.db.get_validators(url) if self.db else None
+        if not validators:
+            return {}
+        headers = {}
+        if validators['etag']:
+            headers['If-None-Match'] = validators['etag']
+        if validators['last_modified']:
+            headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    def _record_response(self, url: str, html_content: str, headers):
+        """Salva validadores (ETag/Last-Modified) e HTML bruto de uma resposta 200"""
+        if not self.db:
+            return
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if etag or last_modified:
+            self.db.save_validators(url, etag, last_modified)
+        if self.html_cache:
+            content_hash = self.html_cache.put(html_content)
+            self.db.save_html_cache_entry(url, self.source_name, content_hash, dict(headers))
+
+    def fetch(self, url: str, retries: int = 3, conditional: bool = False) -> Optional[str]:
+        """Faz fetch de uma URL com retry, respeitando o pacing do host
+
+        Com conditional=True envia os validadores salvos e levanta NotModified em 304.
+        """
         session = self._get_session()
+        host = urlparse(url).netloc
+        headers = self._conditional_headers(url) if conditional else {}
         for attempt in range(retries):
+            self.rate_limiter.wait(host)
             try:
-                response = session.get(url, timeout=30)
+                response = session.get(url, timeout=30, headers=headers)
+                self.rate_limiter.feedback(host, response.status_code, response.headers.get('Retry-After'))
+                if response.status_code == 304 and headers:
+                    raise NotModified(url)
                 response.raise_for_status()
+                if conditional:
+                    self._record_response(url, response.text, response.headers)
                 return response.text
             except requests.RequestException as e:
+                if e.response is None:
+                    self.rate_limiter.feedback(host, None)
                 if attempt < retries - 1:
                     time.sleep(self.delay * (attempt + 1))
         return None
 
+    async def fetch_async(self, session: 'aiohttp.ClientSession', url: str, retries: int = 3,
+                          headers: Optional[dict] = None) -> Optional[Tuple[str, Any]]:
+        """Versão assíncrona do fetch (engine async), reutilizando conexões keep-alive
+
+        headers são os validadores já consultados fora do loop (levanta NotModified
+        em 304). Retorna (html, headers da resposta); banco e HtmlCache ficam para
+        quem chama, fora do event loop.
+        """
+        host = urlparse(url).netloc
+        headers = headers or {}
+        for attempt in range(retries):
+            await self.rate_limiter.wait_async(host)
+            try:
+                async with session.get(url, headers=headers) as response:
+                    self.rate_limiter.feedback(host, response.status, response.headers.get('Retry-After'))
+                    if response.status == 304 and headers:
+                        raise NotModified(url)
+                    response.raise_for_status()
+                    html_content = await response.text(errors='replace')
+                    return html_content, response.headers.copy()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if not isinstance(e, aiohttp.ClientResponseError):
+                    self.rate_limiter.feedback(host, None)
+                if attempt < retries - 1:
+                    await asyncio.sleep(self.delay * (attempt + 1))
+        return None
+
     def _process_url(self, url: str, db: Optional[ProductsDB], incremental: bool) -> Optional[Product]:
         """Processa uma única URL (para uso em thread)"""
         try:
-            product = self.parse_product(url)
-            if product:
-                # Filtrar por preço mínimo
-                if product.price and product.price >= self.min_price:
-                    # Verificar se mudou (modo incremental)
-                    if incremental and db and not db.product_changed(product):
-                        if db:
-                            db.mark_url_done(url, 'unchanged')
-                        return None
-
-                    # Atualizar cache
-                    if db:
-                        db.update_product_cache(product)
-                        db.mark_url_done(url, 'ok')
+            try:
+                product = self.parse_product(url, conditional=bool(db))
+            except NotModified:
+                return self._process_not_modified(url, db, incremental)
+            return self._handle_product(url, product, db, incremental)
+        except Exception as e:
+            if db:
+                db.mark_url_error(url, str(e))
+            logger.error(f"Erro processando {url}: {e}")
 
-                    return product
-                else:
-                    if db:
-                        db.mark_url_done(url, f'price_below_{self.min_price}')
-            else:
-                if db:
-                    db.mark_url_done(url, 'no_data')
+        return None
 
+    def _process_html(self, url: str, html_content: Optional[str], db: Optional[ProductsDB],
+                      incremental: bool, response_headers=None) -> Optional[Product]:
+        """Processa HTML já baixado pela engine async (roda em thread do executor)"""
+        try:
+            if html_content is None:
+                raise FetchError(f"falha no download após as tentativas: {url}")
+            if response_headers is not None:
+                self._record_response(url, html_content, response_headers)
+            product = self._parse_page(url, html_content) if html_content else None
+            return self._handle_product(url, product, db, incremental)
         except Exception as e:
             if db:
                 db.mark_url_error(url, str(e))
@@ -365,10 +1394,189 @@ class BaseScraper(ABC):
 
         return None
 
-    def scrape_all(self, limit: Optional[int] = None, save_callback=None,
-                   save_interval: int = 50, db: Optional[ProductsDB] = None,
-                   incremental: bool = False, resume: bool = False) -> list[Product]:
-        """Scrape todos os produtos com processamento paralelo"""
+    def _process_not_modified(self, url: str, db: Optional[ProductsDB], incremental: bool) -> Optional[Product]:
+        """Resposta 304: reaproveita o produto em cache sem refazer o parse"""
+        try:
+            cached = db.get_cached_product_by_url(url)
+            if cached is None:
+                # Cache sumiu entre o GET condicional e agora: baixar de novo
+                return self._handle_product(url, self.parse_product(url), db, incremental)
+            return self._handle_product(url, cached, db, incremental, not_modified=True)
+        except Exception as e:
+            db.mark_url_error(url, str(e))
+            logger.error(f"Erro processando {url}: {e}")
+
+        return None
+
+    def _handle_product(self, url: str, product: Optional[Product], db: Optional[ProductsDB],
+                        incremental: bool, not_modified: bool = False) -> Optional[Product]:
+        """Aplica filtros e atualiza o banco para um produto já extraído"""
+        if product:
+            # Filtrar por preço mínimo
+            if product.price and product.price >= self.min_price:
+                # 304: produto em cache continua válido (no incremental conta como inalterado)
+                if not_modified:
+                    if db:
+                        db.mark_url_done(url, 'not_modified')
+                    return None if incremental else product
+
+                # Verificar o que mudou (no incremental, inalterados ficam fora)
+                changes = db.product_changes(product) if db else []
+                if incremental and db and changes == []:
+                    db.mark_url_done(url, 'unchanged')
+                    return None
+                if db and changes != []:
+                    self._record_change(product, changes)
+
+                # Atualizar cache
+                if db:
+                    db.update_product_cache(product)
+                    db.mark_url_done(url, 'ok')
+
+                return product
+            else:
+                if db:
+                    db.mark_url_done(url, f'price_below_{self.min_price}')
+        else:
+            if db:
+                db.mark_url_done(url, 'no_data')
+
+        return None
+
+    def _record_change(self, product: Product, groups: Optional[List[str]]):
+        """Guarda o change set do produto (groups=None: produto novo, todos os grupos)"""
+        change = {
+            'id': product.id,
+            'sku': product.sku,
+            'supplier': product.supplier,
+            'sourceUrl': product.sourceUrl,
+            'status': 'new' if groups is None else 'changed',
+            'groups': list(FIELD_GROUPS) if groups is None else groups,
+        }
+        with self._stats_lock:
+            self.changes.append(change)
+
+    def _skip_unchanged_lastmod(self, entries: List[Tuple[str, Optional[str]]], history: Dict[str, dict],
+                                db: ProductsDB) -> Tuple[List[str], List[Product], int]:
+        """Separa URLs a baixar das que não mudaram desde o último scrape (pelo lastmod do sitemap)
+
+        Retorna (urls_para_baixar, produtos_em_cache_reaproveitados, urls_puladas).
+        """
+        to_fetch = []
+        carried = []
+        skipped = []
+        for url, lastmod in entries:
+            previous = history.get(url)
+            modified = parse_lastmod(lastmod)
+            processed_at = previous and previous['status'] == 'done' and previous['processed_at']
+            if not processed_at or not modified or modified > datetime.fromisoformat(processed_at):
+                to_fetch.append(url)
+                continue
+
+            result = previous['result'] or ''
+            if result in ('no_data', f'price_below_{self.min_price}'):
+                # Página baixada e sem produto válido: nada a reaproveitar, mas também
+                # nada mudou (falhas de download ficam com status 'error' e são refeitas)
+                skipped.append((url, result))
+                continue
+
+            cached = db.get_cached_product_by_url(url)
+            if cached is None:
+                to_fetch.append(url)
+                continue
+            if not cached.price or cached.price < self.min_price:
+                skipped.append((url, f'price_below_{self.min_price}'))
+                continue
+            carried.append(cached)
+            skipped.append((url, 'lastmod_unchanged'))
+
+        if skipped:
+            db.mark_urls_done(skipped)
+        return to_fetch, carried, len(skipped)
+
+    def _stream_urls(self, db: Optional[ProductsDB], since_lastmod: bool, carry) -> Iterator[str]:
+        """Lê o sitemap em streaming e libera URLs para o crawl conforme chegam
+
+        As URLs são registradas no banco em lotes antes de serem liberadas.
+        Com since_lastmod, as que não mudaram são marcadas como processadas e
+        seus produtos em cache são entregues a carry(). Lido o sitemap
+        inteiro, as URLs que saíram dele são marcadas como descontinuadas.
+        """
+        # Histórico precisa ser lido antes do registro (que volta as URLs para 'pending')
+        history = db.get_url_history(self.source_name) if db and since_lastmod else {}
+        previous = db.begin_url_sync(self.source_name) if db else set()
+
+        seen = set()
+        batch: List[Tuple[str, Optional[str]]] = []
+        totals = {'found': 0, 'skipped': 0, 'carried': 0, 'added': 0}
+
+        def release() -> List[str]:
+            totals['found'] += len(batch)
+            if not db:
+                return [url for url, _ in batch]
+            totals['added'] += sum(url not in previous for url, _ in batch)
+            db.register_urls([url for url, _ in batch], self.source_name,
+                             {url: lastmod for url, lastmod in batch if lastmod})
+            if not since_lastmod:
+                return [url for url, _ in batch]
+            urls, carried, skipped = self._skip_unchanged_lastmod(batch, history, db)
+            totals['skipped'] += skipped
+            totals['carried'] += len(carried)
+            for product in carried:
+                carry(product)
+            return urls
+
+        for url, lastmod in self.iter_sitemap_entries():
+            if url in seen:
+                continue
+            seen.add(url)
+            batch.append((url, lastmod))
+            if len(batch) >= self.URL_BATCH_SIZE:
+                yield from release()
+                batch = []
+        if batch:
+            yield from release()
+
+        logger.info(f"Encontradas {totals['found']} URLs de produtos")
+        if db:
+            if self.sitemap_complete and totals['found']:
+                removed = db.discontinue_missing_urls(self.source_name)
+            else:
+                removed = 0
+                logger.warning("Sitemap incompleto: URLs ausentes não foram marcadas como descontinuadas")
+            logger.info(f"Sitemap: {totals['added']} URLs novas, {totals['found'] - totals['added']} mantidas, "
+                        f"{removed} removidas (descontinuadas)")
+        if since_lastmod and db:
+            logger.info(f"lastmod: {totals['found'] - totals['skipped']} URLs novas/alteradas, "
+                        f"{totals['skipped']} sem mudança ({totals['carried']} produtos reaproveitados do cache)")
+
+    def scrape_all(self, limit: Optional[int] = None, checkpoint=None,
+                   db: Optional[ProductsDB] = None,
+                   incremental: bool = False, resume: bool = False,
+                   since_lastmod: bool = False) -> list[Product]:
+        """Scrape todos os produtos com processamento paralelo
+
+        O crawl começa enquanto o sitemap ainda está sendo baixado. Com
+        since_lastmod=True só baixa URLs novas no sitemap ou com lastmod
+        posterior ao último scrape; as demais vêm do cache do banco.
+        checkpoint(produto) recebe cada produto extraído (ex: ProductJournal.append).
+        """
+        self.db = db
+        self.changes = []
+        if db:
+            # Verificação de mudança em memória, sem um SELECT por produto
+            db.load_content_hashes(self.source_name)
+
+        products = []
+        products_lock = threading.Lock()
+        processed = 0
+        queued = 0
+        processed_lock = threading.Lock()
+
+        def carry(product: Product) -> None:
+            # Produtos sem mudança no sitemap entram direto no resultado
+            with products_lock:
+                products.append(product)
 
         # Obter URLs
         if resume and db:
@@ -376,7 +1584,7 @@ class BaseScraper(ABC):
             pending_urls = db.get_pending_urls(self.source_name)
             if pending_urls:
                 logger.info(f"Continuando de onde parou: {len(pending_urls)} URLs pendentes")
-                urls = pending_urls
+                url_source = iter(pending_urls)
             else:
                 # Verificar se já tem URLs registradas
                 all_urls = db.get_all_urls(self.source_name)
@@ -384,30 +1592,25 @@ class BaseScraper(ABC):
                     logger.info(f"Todas as {len(all_urls)} URLs já foram processadas")
                     return []
                 # Buscar novas URLs
-                urls = self.get_product_urls()
-                db.register_urls(urls, self.source_name)
+                url_source = self._stream_urls(db, False, carry)
         else:
-            urls = self.get_product_urls()
-            if db:
-                # Resetar e registrar novas URLs
-                db.reset_urls(self.source_name)
-                db.register_urls(urls, self.source_name)
-
-        logger.info(f"Encontradas {len(urls)} URLs de produtos")
+            url_source = self._stream_urls(db, since_lastmod, carry)
 
         if limit:
-            urls = urls[:limit]
+            url_source = itertools.islice(url_source, limit)
             logger.info(f"Limitando a {limit} produtos (modo teste)")
 
-        products = []
-        products_lock = threading.Lock()
-        processed = 0
-        processed_lock = threading.Lock()
+        def counted(source: Iterable[str]) -> Iterator[str]:
+            nonlocal queued
+            for url in source:
+                with processed_lock:
+                    queued += 1
+                yield url
 
-        def process_and_collect(url: str) -> None:
-            nonlocal processed
-            product = self._process_url(url, db, incremental)
+        url_source = counted(url_source)
 
+        def collect(url: str, product: Optional[Product]) -> None:
+            nonlocal processed
             with processed_lock:
                 processed += 1
                 current = processed
@@ -415,52 +1618,161 @@ class BaseScraper(ABC):
             if product:
                 with products_lock:
                     products.append(product)
-                    count = len(products)
 
-                logger.info(f"[{current}/{len(urls)}] ✓ {product.name[:50]}... - R$ {product.price:.2f}")
+                logger.info(f"[{current}/{queued}] ✓ {product.name[:50]}... - R$ {product.price:.2f}")
 
-                # Salvar incrementalmente
-                if save_callback and count % save_interval == 0:
-                    with products_lock:
-                        save_callback(list(products), self.source_name)
-                    logger.info(f"  📁 Salvamento incremental: {count} produtos")
+                # Checkpoint (só enfileira: não segura os workers)
+                if checkpoint:
+                    checkpoint(product)
             else:
                 if current % 100 == 0:
-                    logger.info(f"[{current}/{len(urls)}] Progresso...")
+                    logger.info(f"[{current}/{queued}] Progresso...")
 
-            # Rate limiting por thread
-            time.sleep(self.delay)
+        if self.engine == 'async':
+            logger.info(f"Iniciando engine async: {self.concurrency} requests em voo, "
+                        f"{self.per_host} conexões por host, {self.workers} threads de parse...")
+            asyncio.run(self._run_async(url_source, collect, db, incremental))
+        else:
+            def process_and_collect(url: str) -> None:
+                collect(url, self._process_url(url, db, incremental))
 
-        # Processar em paralelo
-        logger.info(f"Iniciando processamento paralelo com {self.workers} workers...")
-        with ThreadPoolExecutor(max_workers=self.workers) as executor:
-            futures = {executor.submit(process_and_collect, url): url for url in urls}
+            # Processar em paralelo, submetendo URLs conforme o sitemap chega
+            logger.info(f"Iniciando processamento paralelo com {self.workers} workers"
+                        f"{' + pool de processos de parse' if self.parse_pool else ''}...")
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = {executor.submit(process_and_collect, url): url for url in url_source}
+
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        url = futures[future]
+                        logger.error(f"Erro em thread para {url}: {e}")
+
+        if db:
+            # Progresso gravado antes do resumo (e de quem ler o banco em seguida)
+            db.flush()
+        logger.info(f"Processamento concluído: {len(products)} produtos válidos de {queued} URLs")
+        if db and (incremental or resume):
+            # Só os alterados (ou pendentes) vieram do crawl: o resto do catálogo vem do cache
+            seen = {product.sourceUrl for product in products} | {product.id for product in products}
+            carried = [product for product in db.get_carried_products(self.source_name, self.min_price)
+                       if product.sourceUrl not in seen and product.id not in seen]
+            logger.info(f"{len(products)} produtos do crawl + {len(carried)} sem mudança reaproveitados do cache")
+            products.extend(carried)
+        if self.parse_stats['pages']:
+            logger.info(f"Parse sem DOM (fast path): {self.parse_stats['no_dom']} de "
+                        f"{self.parse_stats['pages']} páginas")
+        if self.path_hits:
+            winners = ', '.join(f"{field}={max(counts, key=counts.get)}" for field, counts in self.path_hits.items())
+            logger.info(f"Caminhos de extração mais usados: {winners}")
+        return products
+
+    async def _run_async(self, url_source: Iterator[str], collect, db: Optional[ProductsDB], incremental: bool):
+        """Loop asyncio: fetch concorrente com conexões keep-alive em pool.
 
-            for future in as_completed(futures):
+        O fetch acontece no event loop; parse, banco, HtmlCache e callbacks de
+        salvamento rodam em um pool de threads para não bloquear o loop (o parse em si
+        vai para o pool de processos, quando configurado). As URLs chegam
+        de uma thread produtora (sitemap em streaming) por uma fila limitada.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 4)
+
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.per_host,
+            ttl_dns_cache=300,
+        )
+        timeout = aiohttp.ClientTimeout(total=30)
+
+        def produce() -> None:
+            try:
+                for url in url_source:
+                    asyncio.run_coroutine_threadsafe(queue.put(url), loop).result()
+            finally:
+                # Um sentinela por worker
+                for _ in range(self.concurrency):
+                    asyncio.run_coroutine_threadsafe(queue.put(None), loop).result()
+
+        def process_and_collect(url: str, response: Optional[Tuple[str, Any]]) -> None:
+            html_content, response_headers = response or (None, None)
+            collect(url, self._process_html(url, html_content, db, incremental, response_headers))
+
+        def not_modified_and_collect(url: str) -> None:
+            collect(url, self._process_not_modified(url, db, incremental))
+
+        async def worker():
+            while True:
+                url = await queue.get()
+                if url is None:
+                    return
                 try:
-                    future.result()
+                    # Consulta ao SQLite fora do loop, para não travar os requests em voo
+                    validators = await loop.run_in_executor(executor, self._conditional_headers, url) if db else {}
+                    try:
+                        response = await self.fetch_async(session, url, headers=validators)
+                    except NotModified:
+                        await loop.run_in_executor(executor, not_modified_and_collect, url)
+                        continue
+                    await loop.run_in_executor(executor, process_and_collect, url, response)
                 except Exception as e:
-                    url = futures[future]
-                    logger.error(f"Erro em thread para {url}: {e}")
+                    logger.error(f"Erro em worker async para {url}: {e}")
 
-        logger.info(f"Processamento concluído: {len(products)} produtos válidos de {len(urls)} URLs")
-        return products
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=HEADERS) as session:
+                producer = loop.run_in_executor(None, produce)
+                await asyncio.gather(producer, *(worker() for _ in range(self.concurrency)))
 
 
 class MagazordScraper(BaseScraper):
     """Scraper unificado para sites Magazord (Proesi, Loja Vale, Seel)"""
 
-    def __init__(self, supplier_key: str, min_price: float = 100.0, delay: float = 0.5, workers: int = 5):
-        super().__init__(min_price, delay, workers)
+    DATA_PRODUCT_BUDGET = 0.5  # Segundos por página para achar e decodificar o dataProduct
+
+    def __init__(self, supplier_key: str, min_price: float = 100.0, delay: float = 0.5, workers: int = 5,
+                 engine: str = 'threads', concurrency: int = 128, per_host: int = 32,
+                 rate_limit: Optional[float] = None, rate_limiter: Optional[HostRateLimiter] = None,
+                 html_cache: Optional[HtmlCache] = None, parser_engine: str = 'soup',
+                 parse_pool: Optional[ProcessPoolExecutor] = None):
+        super().__init__(min_price, delay, workers, engine, concurrency, per_host, rate_limiter, html_cache,
+                         parse_pool)
         if supplier_key not in SUPPLIERS:
             raise ValueError(f"Fornecedor desconhecido: {supplier_key}")
+        if parser_engine not in PARSER_ENGINES:
+            raise ValueError(f"Engine de parse desconhecida: {parser_engine}")
         self.supplier_key = supplier_key
         self.config = SUPPLIERS[supplier_key]
+        self.parser_engine = parser_engine
+        # Seletores compilados uma vez por scraper e por thread (XPath do lxml não é thread-safe)
+        self._selectors_local = threading.local()
+        # Budget de requests/segundo do host (CLI --rps tem prioridade sobre SUPPLIERS)
+        self.rate_limiter.configure(
+            urlparse(self.base_url).netloc,
+            rate_limit or self.config.get('rate_limit', HostRateLimiter.DEFAULT_RATE)
+        )
 
     @property
     def source_name(self) -> str:
         return self.config['name']
 
+    def worker_spec(self) -> Optional[tuple]:
+        return (self.supplier_key, self.parser_engine)
+
+    def _selectors(self) -> Dict[str, Any]:
+        """Seletores compilados para a engine de parse desta instância"""
+        selectors = getattr(self._selectors_local, 'selectors', None)
+        if selectors is None:
+            compile_selector = PARSER_ENGINES[self.parser_engine][1]
+            selectors = {key: compile_selector(css, xpath) for key, (css, xpath) in SELECTORS.items()}
+            self._selectors_local.selectors = selectors
+        return selectors
+
+    def _build_document(self, html_content: str):
+        """Monta o DOM da página com a engine configurada (soup ou lxml)"""
+        document_class = PARSER_ENGINES[self.parser_engine][0]
+        return document_class(html_content, self._selectors())
+
     @property
     def base_url(self) -> str:
         return self.config['base_url']
@@ -471,27 +1783,66 @@ class MagazordScraper(BaseScraper):
 
     def get_product_urls(self) -> list[str]:
         """Baixa sitemap e extrai URLs de produtos"""
-        sitemap_url = self.config['sitemap']
-        logger.info(f"Baixando sitemap: {sitemap_url}")
-
-        xml = self.fetch(sitemap_url)
-        if not xml:
-            logger.error("Falha ao baixar sitemap")
-            return []
-
-        soup = BeautifulSoup(xml, 'lxml-xml')
-        all_urls = [loc.text for loc in soup.find_all('loc')]
-
-        # Filtrar apenas URLs de produtos (excluir CDN, imagens, etc)
-        urls = [
-            url for url in all_urls
-            if url.startswith(self.base_url)
-            and not url.endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp', '.pdf'))
-            and 'cdn.magazord' not in url
-        ]
-
-        logger.info(f"Extraídas {len(urls)} URLs de produtos (de {len(all_urls)} no sitemap)")
-        return urls
+        return [url for url, _ in self.get_sitemap_entries()]
+
+    def get_sitemap_entries(self) -> List[Tuple[str, Optional[str]]]:
+        """Baixa sitemap e extrai (url, lastmod) dos produtos"""
+        return list(self.iter_sitemap_entries())
+
+    def iter_sitemap_entries(self) -> Iterator[Tuple[str, Optional[str]]]:
+        """Lê o sitemap em streaming, seguindo <sitemapindex>, e gera (url, lastmod) dos produtos"""
+        pending = [self.config['sitemap']]
+        visited = set()
+        total = kept = 0
+        self.sitemap_complete = True
+        while pending:
+            sitemap_url = pending.pop(0)
+            if sitemap_url in visited:
+                continue
+            visited.add(sitemap_url)
+            logger.info(f"Baixando sitemap: {sitemap_url}")
+
+            for kind, url, lastmod in self._stream_sitemap(sitemap_url):
+                if kind == 'sitemap':
+                    pending.append(url)
+                    continue
+                total += 1
+                # Filtrar apenas URLs de produtos (excluir CDN, imagens, etc)
+                if (url.startswith(self.base_url)
+                        and not url.endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp', '.pdf'))
+                        and 'cdn.magazord' not in url):
+                    kept += 1
+                    yield url, lastmod
+
+        logger.info(f"Extraídas {kept} URLs de produtos (de {total} no sitemap)")
+
+    def _stream_sitemap(self, sitemap_url: str, retries: int = 3) -> Iterator[Tuple[str, str, Optional[str]]]:
+        """Baixa um sitemap em streaming e gera as entradas conforme são lidas"""
+        session = self._get_session()
+        host = urlparse(sitemap_url).netloc
+        for attempt in range(retries):
+            produced = 0
+            self.rate_limiter.wait(host)
+            try:
+                with session.get(sitemap_url, timeout=30, stream=True) as response:
+                    self.rate_limiter.feedback(host, response.status_code, response.headers.get('Retry-After'))
+                    response.raise_for_status()
+                    for entry in iter_sitemap_xml(response.iter_content(chunk_size=64 * 1024)):
+                        produced += 1
+                        yield entry
+                return
+            except (requests.RequestException, ET.ParseError) as e:
+                if produced:
+                    # Entradas já foram entregues ao crawl: não dá para recomeçar
+                    logger.error(f"Sitemap interrompido após {produced} entradas: {sitemap_url}: {e}")
+                    self.sitemap_complete = False
+                    return
+                if isinstance(e, requests.RequestException) and e.response is None:
+                    self.rate_limiter.feedback(host, None)
+                if attempt < retries - 1:
+                    time.sleep(self.delay * (attempt + 1))
+        logger.error(f"Falha ao baixar sitemap: {sitemap_url}")
+        self.sitemap_complete = False
 
     def _extract_data_product(self, html_content: str) -> Optional[dict]:
         """Extrai objeto dataProduct do JavaScript.
@@ -502,83 +1853,67 @@ class MagazordScraper(BaseScraper):
           is a valid JSON object with "produto_id", "midias", etc.
         - Some sites: `window.dataProduct = {...};`
         - Proesi/Seel: No dataProduct at all (images are in HTML gallery).
-        """
-        result = {}
-
-        # Tentar extrair o JSON completo primeiro
-        patterns = [
-            r'window\.dataProduct\s*=\s*({[\s\S]*?});?\s*(?:window\.|</script>)',
-            r'const\s+dataProduct\s*=\s*({[\s\S]*?});?\s*(?:</script>)',
-            r'dataProduct\s*=\s*({[\s\S]*?});?\s*(?:window\.|</script>)',
-        ]
 
-        for pattern in patterns:
-            match = re.search(pattern, html_content)
-            if match:
-                try:
-                    json_str = match.group(1)
-                    json_str = re.sub(r',\s*}', '}', json_str)
-                    json_str = re.sub(r',\s*]', ']', json_str)
-                    return json.loads(json_str)
-                except json.JSONDecodeError:
-                    pass
-
-        # Fallback: extrair o campo produto JSON de dentro de dataProduct
-        # (formato JS com chaves não-quoted: { id: '...', produto: {...} })
-        # Usa busca por brace-matching para extrair o JSON completo do produto
-        prod_start_match = re.search(r'(?:const|var|window\.)\s*dataProduct\s*=\s*\{[^}]*?produto:\s*(\{"produto_id")', html_content)
-        if prod_start_match:
-            json_start = prod_start_match.start(1)
-            brace_count = 0
-            i = json_start
-            while i < len(html_content):
-                if html_content[i] == '{':
-                    brace_count += 1
-                elif html_content[i] == '}':
-                    brace_count -= 1
-                    if brace_count == 0:
-                        json_end = i + 1
-                        try:
-                            produto_data = json.loads(html_content[json_start:json_end])
-                            result['produto'] = produto_data
-                        except json.JSONDecodeError:
-                            pass
-                        break
-                i += 1
-
-        # Fallback: extrair campos individuais (formato JS não-JSON)
-        if not result:
-            # Extrair breadcrumb
-            bc_match = re.search(r'breadcrumb:\s*(\[[\s\S]*?\])\s*,', html_content)
-            if bc_match:
-                try:
-                    result['breadcrumb'] = json.loads(bc_match.group(1))
-                except json.JSONDecodeError:
-                    pass
+        Uma passada só pelo HTML: acha a âncora, delimita o objeto com o
+        scanner de literais e decodifica com json. Estourando
+        DATA_PRODUCT_BUDGET, desiste e o parse segue por JSON-LD/HTML.
+        """
+        deadline = time.monotonic() + self.DATA_PRODUCT_BUDGET
+        try:
+            return self._scan_data_product(html_content, deadline)
+        except ScanTimeout:
+            logger.warning(f"dataProduct: extração passou de {self.DATA_PRODUCT_BUDGET}s, ignorando")
+            return None
 
-            # Extrair produto (JSON embedded antes de derivacao)
-            prod_match = re.search(r'produto:\s*(\{"produto_id"[\s\S]*?\})\s*,\s*derivacao:', html_content)
-            if prod_match:
-                try:
-                    result['produto'] = json.loads(prod_match.group(1))
-                except json.JSONDecodeError:
-                    pass
+    def _scan_data_product(self, html_content: str, deadline: float) -> Optional[dict]:
+        fields: Dict[str, Tuple[int, int]] = {}
+        for anchor in DATA_PRODUCT_RE.finditer(html_content):
+            start = anchor.end()
+            end = _js_value_end(html_content, start, deadline)
+            if end is None:
+                continue
+            # Objeto inteiro em JSON válido
+            data = _loads_js_json(html_content[start:end])
+            if isinstance(data, dict):
+                return data
+            # Objeto JS com chaves sem aspas: decodifica campo a campo
+            fields = _js_object_fields(html_content, start, end, deadline)
+            break
+
+        def field(key: str) -> Any:
+            span = fields.get(key)
+            if span is None:
+                # Campo fora de um dataProduct reconhecível: procura a chave na página
+                anchor = next((m for m in JS_FIELD_RES[key].finditer(html_content)
+                               if not m.start() or not re.match(r'[\w$]', html_content[m.start() - 1])), None)
+                if not anchor:
+                    return None
+                value_end = _js_value_end(html_content, anchor.end(), deadline)
+                if value_end is None:
+                    return None
+                span = (anchor.end(), value_end)
+            return _loads_js_json(html_content[span[0]:span[1]])
 
-            # Extrair derivacao (contém preço e estoque)
-            deriv_match = re.search(r'derivacao:\s*(\{[\s\S]*?"preco"[\s\S]*?\})\s*,\s*(?:breadcrumb|depositos):', html_content)
-            if deriv_match:
-                try:
-                    result['derivacao'] = json.loads(deriv_match.group(1))
-                except json.JSONDecodeError:
-                    pass
+        result = {}
+        produto = field('produto')
+        if isinstance(produto, dict):
+            result['produto'] = produto
+        else:
+            # Sem produto decodificável: aproveitar o que der (breadcrumb, derivacao com preço)
+            breadcrumb = field('breadcrumb')
+            if isinstance(breadcrumb, list):
+                result['breadcrumb'] = breadcrumb
+            derivacao = field('derivacao')
+            if isinstance(derivacao, dict):
+                result['derivacao'] = derivacao
 
         return result if result else None
 
-    def _extract_json_ld(self, soup: BeautifulSoup) -> Optional[dict]:
-        """Extrai dados JSON-LD do Schema.org"""
-        for script in soup.find_all('script', type='application/ld+json'):
+    def _extract_json_ld(self, html_content: str) -> Optional[dict]:
+        """Extrai dados JSON-LD do Schema.org (direto do HTML, sem montar DOM)"""
+        for match in JSON_LD_RE.finditer(html_content):
             try:
-                data = json.loads(script.string)
+                data = json.loads(match.group(1))
                 if isinstance(data, dict) and data.get('@type') == 'Product':
                     return data
                 elif isinstance(data, list):
@@ -616,101 +1951,138 @@ class MagazordScraper(BaseScraper):
         text = re.sub(r'\s+', ' ', text).strip()
         return text if text else None
 
-    def parse_product(self, url: str) -> Optional[Product]:
-        """Parse de página de produto Magazord"""
-        html_content = self.fetch(url)
-        if not html_content:
-            return None
+    def parse_html(self, url: str, html_content: str) -> Optional[Product]:
+        """Parse de página de produto Magazord
 
-        soup = BeautifulSoup(html_content, 'html.parser')
+        O DOM (soup ou lxml, conforme parser_engine) só é montado quando algum
+        campo precisa cair para seletores HTML; páginas resolvidas por
+        dataProduct/JSON-LD não pagam o custo da árvore. dataProduct e JSON-LD
+        também só são extraídos quando algum caminho precisa deles.
 
-        try:
-            # Tentar extrair dados estruturados
-            data_product = self._extract_data_product(html_content)
-            json_ld = self._extract_json_ld(soup)
+        Cada campo tem seus caminhos de extração em ordem de preferência fixa
+        (ver _first_hit).
+        """
+        doc = None
+        structured = {}
 
-            # Nome do produto
-            name = None
-            if data_product and data_product.get('produto', {}).get('nome'):
-                name = data_product['produto']['nome']
-            elif json_ld and json_ld.get('name'):
-                name = json_ld['name']
-            else:
-                name_el = soup.select_one('h1.product-name, h1[itemprop="name"], .product-title h1, h1')
-                name = name_el.get_text(strip=True) if name_el else None
+        def dom():
+            nonlocal doc
+            if doc is None:
+                doc = self._build_document(html_content)
+            return doc
+
+        def data_product() -> Optional[dict]:
+            if 'data_product' not in structured:
+                structured['data_product'] = self._extract_data_product(html_content)
+            return structured['data_product']
+
+        def json_ld() -> Optional[dict]:
+            if 'json_ld' not in structured:
+                structured['json_ld'] = self._extract_json_ld(html_content)
+            return structured['json_ld']
 
+        def produto() -> dict:
+            return (data_product() or {}).get('produto', {})
+
+        try:
+            # Nome do produto
+            def name_from_html():
+                name_el = dom().first('name')
+                return doc.text(name_el) if name_el is not None else None
+
+            name = self._first_hit('name', {
+                'dataProduct': lambda: produto().get('nome'),
+                'json_ld': lambda: (json_ld() or {}).get('name'),
+                'html': name_from_html,
+            })
             if not name:
                 return None
 
             # SKU
-            sku = None
-            if data_product:
-                sku = data_product.get('produto', {}).get('referencia')
-                if not sku:
-                    sku = str(data_product.get('derivacao', {}).get('id', ''))
-            if not sku and json_ld:
-                sku = json_ld.get('sku')
-            if not sku:
-                sku_el = soup.select_one('.caract-referencia dd, [itemprop="sku"], .product-sku')
-                if sku_el:
-                    sku = sku_el.get_text(strip=True)
+            def sku_from_data_product():
+                if not data_product():
+                    return None
+                return produto().get('referencia') or str(data_product().get('derivacao', {}).get('id', ''))
+
+            def sku_from_html():
+                sku_el = dom().first('sku')
+                return doc.text(sku_el) if sku_el is not None else None
+
+            sku = self._first_hit('sku', {
+                'dataProduct': sku_from_data_product,
+                'json_ld': lambda: (json_ld() or {}).get('sku'),
+                'html': sku_from_html,
+            })
             if not sku:
                 # Gerar a partir da URL
                 sku = url.split('/')[-1][:50]
 
             # Preço
-            price = None
             price_pix = None
-            if data_product:
+
+            def price_from_data_product():
+                nonlocal price_pix
+                if not data_product():
+                    return None
                 # Formato antigo: derivacao.preco
-                preco_data = data_product.get('derivacao', {}).get('preco', {})
-                price = preco_data.get('precoPor') or preco_data.get('precoDe')
+                preco_data = data_product().get('derivacao', {}).get('preco', {})
                 price_pix = preco_data.get('precoPix')
+                price = preco_data.get('precoPor') or preco_data.get('precoDe')
 
                 # Formato Loja Vale: produto.valor (string ou float)
                 if not price:
-                    valor = data_product.get('produto', {}).get('valor')
+                    valor = produto().get('valor')
                     if valor:
                         try:
                             price = float(str(valor).replace(',', '.'))
                         except (ValueError, TypeError):
                             pass
+                return price
 
-            if not price:
+            def price_from_meta():
                 # Tentar meta tags
-                price_meta = soup.select_one('meta[property="product:price:amount"], meta[property="og:price:amount"]')
-                if price_meta and price_meta.get('content'):
+                price_meta = dom().first('price_meta')
+                if price_meta is not None and doc.attr(price_meta, 'content'):
                     try:
-                        price = float(price_meta['content'].replace(',', '.'))
+                        return float(doc.attr(price_meta, 'content').replace(',', '.'))
                     except ValueError:
                         pass
+                return None
 
-            if not price and json_ld:
-                offers = json_ld.get('offers', {})
+            def price_from_json_ld():
+                if not json_ld():
+                    return None
+                offers = json_ld().get('offers', {})
                 if isinstance(offers, list):
                     offers = offers[0] if offers else {}
                 price_str = offers.get('price')
                 if price_str:
                     try:
-                        price = float(str(price_str).replace(',', '.'))
+                        return float(str(price_str).replace(',', '.'))
                     except ValueError:
                         pass
+                return None
 
+            price = self._first_hit('price', {
+                'dataProduct': price_from_data_product,
+                'meta': price_from_meta,
+                'json_ld': price_from_json_ld,
+            })
             if not price:
                 return None
 
-            # Estoque
-            stock = None
-            in_stock = True
-            if data_product:
+            # Estoque: (quantidade, disponível)
+            def stock_from_data_product():
+                if not data_product():
+                    return None
                 # Formato antigo: derivacao.estoque
-                estoque = data_product.get('derivacao', {}).get('estoque', {})
+                estoque = data_product().get('derivacao', {}).get('estoque', {})
                 stock = estoque.get('quantidade')
                 in_stock = estoque.get('disponivel', True)
 
                 # Formato Loja Vale: produto.qtde_estoque
                 if stock is None:
-                    qtde = data_product.get('produto', {}).get('qtde_estoque')
+                    qtde = produto().get('qtde_estoque')
                     if qtde is not None:
                         try:
                             stock = int(qtde)
@@ -718,213 +2090,229 @@ class MagazordScraper(BaseScraper):
                         except (ValueError, TypeError):
                             pass
 
-            if in_stock and json_ld:
-                # Verificar JSON-LD como complemento
-                availability = json_ld.get('offers', {}).get('availability', '')
-                if 'OutOfStock' in availability:
-                    in_stock = False
+                if in_stock and json_ld():
+                    # Verificar JSON-LD como complemento
+                    availability = json_ld().get('offers', {}).get('availability', '')
+                    if 'OutOfStock' in availability:
+                        in_stock = False
+                return stock, in_stock
+
+            def stock_from_json_ld():
+                if not json_ld():
+                    return None
+                availability = json_ld().get('offers', {}).get('availability', '')
+                return None, 'InStock' in availability
 
-            if not data_product and not stock and json_ld:
-                availability = json_ld.get('offers', {}).get('availability', '')
-                in_stock = 'InStock' in availability
+            stock, in_stock = self._first_hit('stock', {
+                'dataProduct': stock_from_data_product,
+                'json_ld': stock_from_json_ld,
+            }) or (None, True)
 
             # Marca
-            brand = None
-            if data_product:
-                marca_data = data_product.get('produto', {}).get('marca')
+            def brand_from_data_product():
+                marca_data = produto().get('marca')
                 if isinstance(marca_data, dict):
-                    brand = marca_data.get('nome')
-                elif isinstance(marca_data, str) and marca_data:
-                    brand = marca_data
-            if not brand and json_ld:
-                brand_data = json_ld.get('brand', {})
-                brand = brand_data.get('name') if isinstance(brand_data, dict) else brand_data
-            if not brand:
-                brand_el = soup.select_one('[itemprop="brand"], .product-brand, .marca')
-                if brand_el:
-                    brand = brand_el.get_text(strip=True)
+                    return marca_data.get('nome')
+                return marca_data if isinstance(marca_data, str) else None
+
+            def brand_from_json_ld():
+                brand_data = (json_ld() or {}).get('brand', {})
+                return brand_data.get('name') if isinstance(brand_data, dict) else brand_data
+
+            def brand_from_html():
+                brand_el = dom().first('brand')
+                return doc.text(brand_el) if brand_el is not None else None
+
+            brand = self._first_hit('brand', {
+                'dataProduct': brand_from_data_product,
+                'json_ld': brand_from_json_ld,
+                'html': brand_from_html,
+            })
 
             # Imagens
-            image = None
-            images = []
-
-            # 1. Tentar derivacao.imagens (formato antigo Magazord)
-            if data_product:
-                imagens = data_product.get('derivacao', {}).get('imagens', [])
-                for img in imagens:
-                    img_url = img.get('maior') or img.get('media') or img.get('menor')
-                    if img_url and img_url not in images:
-                        images.append(img_url)
-
-            # 2. Tentar produto.midias[] (formato Loja Vale / Magazord React)
-            #    Cada midia tem midia_path e midia_arquivo_nome que formam a URL CDN
-            if not images and data_product:
-                produto_data = data_product.get('produto', {})
+            def add_image(images: list, img_url: Optional[str]):
+                if img_url and img_url not in images:
+                    images.append(img_url)
+
+            def images_from_derivacao():
+                # Formato antigo Magazord: derivacao.imagens
+                images = []
+                for img in (data_product() or {}).get('derivacao', {}).get('imagens', []):
+                    add_image(images, img.get('maior') or img.get('media') or img.get('menor'))
+                return images
+
+            def images_from_midias():
+                # Formato Loja Vale / Magazord React: produto.midias[]
+                # Cada midia tem midia_path e midia_arquivo_nome que formam a URL CDN
+                # Ex: https://www.lojavale.com.br -> https://lojavale.cdn.magazord.com.br/
+                images = []
+                produto_data = produto()
                 midias = produto_data.get('midias', [])
                 if midias:
-                    # Detectar CDN base a partir do base_url do fornecedor
-                    # Ex: https://www.lojavale.com.br -> https://lojavale.cdn.magazord.com.br/
                     cdn_base = self._get_cdn_base()
                     for midia in midias:
                         if midia.get('tipo_midia') == 1:  # tipo_midia 1 = imagem
                             mpath = midia.get('midia_path', '')
                             mnome = midia.get('midia_arquivo_nome', '')
                             if mpath and mnome:
-                                img_url = f"{cdn_base}{mpath}{mnome}"
-                                if img_url not in images:
-                                    images.append(img_url)
+                                add_image(images, f"{cdn_base}{mpath}{mnome}")
                     # Se nenhum tipo_midia==1, tentar todos
                     if not images:
                         for midia in midias:
                             mpath = midia.get('midia_path', '')
                             mnome = midia.get('midia_arquivo_nome', '')
                             if mpath and mnome:
-                                img_url = f"{cdn_base}{mpath}{mnome}"
-                                if img_url not in images:
-                                    images.append(img_url)
+                                add_image(images, f"{cdn_base}{mpath}{mnome}")
                 # Fallback: midia_path/midia_arquivo_nome no nível do produto
                 if not images:
                     mpath = produto_data.get('midia_path', '')
                     mnome = produto_data.get('midia_arquivo_nome', '')
                     if mpath and mnome:
-                        cdn_base = self._get_cdn_base()
-                        img_url = f"{cdn_base}{mpath}{mnome}"
-                        images.append(img_url)
-
-            # 3. Extrair da galeria HTML (Proesi, Seel, e outros Magazord)
-            #    O swiper gallery-thumbs contém thumbnails com data-img-full
-            #    que apontam para a imagem em resolução máxima (sem resize params)
-            if not images:
-                gallery_slides = soup.select('.gallery-thumbs .swiper-slide a[data-img-full]')
-                for slide in gallery_slides:
-                    img_url = slide.get('data-img-full', '').strip()
-                    if img_url and img_url.startswith('http') and img_url not in images:
-                        images.append(img_url)
-
-            # 4. Fallback: imagens no gallery-main (data-img-full ou data-src-max)
-            if not images:
-                gallery_main_imgs = soup.select('.gallery-main .swiper-slide img[data-img-full]')
-                for img_el in gallery_main_imgs:
-                    img_url = img_el.get('data-img-full', '').strip()
-                    if img_url and img_url.startswith('http') and img_url not in images:
-                        images.append(img_url)
-                if not images:
-                    gallery_main_imgs = soup.select('.gallery-main .swiper-slide img[data-src-max]')
-                    for img_el in gallery_main_imgs:
-                        img_url = img_el.get('data-src-max', '').strip()
-                        if img_url and img_url.startswith('http') and img_url not in images:
-                            images.append(img_url)
-
-            # 5. Fallback: JSON-LD images (pode ter array de URLs)
-            if not images and json_ld:
-                ld_images = json_ld.get('image', [])
+                        images.append(f"{self._get_cdn_base()}{mpath}{mnome}")
+                return images
+
+            def images_from_elements(key: str, attribute: str) -> list:
+                images = []
+                for el in dom().all(key):
+                    img_url = doc.attr(el, attribute, '').strip()
+                    if img_url.startswith('http'):
+                        add_image(images, img_url)
+                return images
+
+            def images_from_gallery_main():
+                # gallery-main: data-img-full ou data-src-max
+                return (images_from_elements('gallery_main_full', 'data-img-full')
+                        or images_from_elements('gallery_main_max', 'data-src-max'))
+
+            def images_from_json_ld():
+                # JSON-LD images (pode ter array de URLs)
+                images = []
+                ld_images = (json_ld() or {}).get('image', [])
                 if isinstance(ld_images, str):
                     ld_images = [ld_images]
                 for img_url in ld_images:
-                    if img_url and img_url not in images:
-                        images.append(img_url)
-
-            # 6. Fallback para meta og:image
-            if not images:
-                og_image = soup.select_one('meta[property="og:image"]')
-                if og_image and og_image.get('content'):
-                    images.append(og_image['content'])
-
-            # 7. Fallback para imagens genéricas no HTML
-            if not images:
-                img_elements = soup.select('[itemprop="image"], .product-image img, .gallery-image img')
-                for img_el in img_elements:
-                    img_url = img_el.get('data-src-max') or img_el.get('data-src') or img_el.get('src')
-                    if img_url and img_url.startswith('http') and img_url not in images:
-                        images.append(img_url)
+                    add_image(images, img_url)
+                return images
+
+            def images_from_og_image():
+                og_image = dom().first('og_image')
+                if og_image is not None and doc.attr(og_image, 'content'):
+                    return [doc.attr(og_image, 'content')]
+                return []
+
+            def images_from_html():
+                # Imagens genéricas no HTML
+                images = []
+                for img_el in dom().all('images_generic'):
+                    img_url = doc.attr(img_el, 'data-src-max') or doc.attr(img_el, 'data-src') or doc.attr(img_el, 'src')
+                    if img_url and img_url.startswith('http'):
+                        add_image(images, img_url)
+                return images
+
+            # A galeria HTML (Proesi, Seel) tem thumbnails gallery-thumbs com data-img-full
+            # apontando para a imagem em resolução máxima (sem resize params)
+            images = self._first_hit('images', {
+                'derivacao': images_from_derivacao,
+                'midias': images_from_midias,
+                'gallery_thumbs': lambda: images_from_elements('gallery_thumbs', 'data-img-full'),
+                'gallery_main': images_from_gallery_main,
+                'json_ld': images_from_json_ld,
+                'og_image': images_from_og_image,
+                'html': images_from_html,
+            }) or []
 
             image = images[0] if images else None
 
             # Descrição
-            description = None
-            if data_product:
-                description = data_product.get('produto', {}).get('descricao')
-
-            if not description:
-                desc_el = soup.select_one('#descricao-produto .content, .descricao-produto .content, [itemprop="description"]')
-                if desc_el:
-                    description = desc_el.get_text(strip=True)
+            def description_from_html():
+                desc_el = dom().first('description')
+                return doc.text(desc_el) if desc_el is not None else None
+
+            def description_from_meta():
+                meta_desc = dom().first('meta_description')
+                if meta_desc is not None and doc.attr(meta_desc, 'content'):
+                    return doc.attr(meta_desc, 'content')
+                return None
 
-            if not description:
-                meta_desc = soup.select_one('meta[name="description"]')
-                if meta_desc and meta_desc.get('content'):
-                    description = meta_desc['content']
+            description = self._first_hit('description', {
+                'dataProduct': lambda: produto().get('descricao'),
+                'html': description_from_html,
+                'meta': description_from_meta,
+            })
 
             description = self._clean_text(description)
             if description and len(description) > 3000:
                 description = description[:2997] + '...'
 
-            # Categoria
-            category = None
-            category_path = []
-
-            if data_product:
-                # Tentar categorizacoes primeiro
-                cats = data_product.get('produto', {}).get('categorizacoes', [])
-                if cats:
-                    cat_names = [c.get('nome') for c in cats if c.get('nome')]
-                    category_path = cat_names
-                    if cat_names:
-                        category = cat_names[-1].lower().replace(' ', '-')
-
-                # Se não tiver categorizacoes, tentar breadcrumb do dataProduct
-                if not category_path:
-                    breadcrumb_data = data_product.get('breadcrumb', [])
-                    if breadcrumb_data:
-                        # Pular "Home" (primeiro item)
-                        cat_names = [b.get('nome') for b in breadcrumb_data[1:] if b.get('nome') and b.get('nome') != 'Home']
-                        category_path = cat_names
-                        if cat_names:
-                            category = cat_names[-1].lower().replace(' ', '-')
-
-            # Fallback: extrair do HTML
-            if not category_path:
-                breadcrumb = soup.select('.breadcrumb a, .breadcrumbs a, nav[aria-label="breadcrumb"] a')
-                if breadcrumb:
-                    category_path = [a.get_text(strip=True) for a in breadcrumb[1:]]
-                    if category_path:
-                        category = category_path[-1].lower().replace(' ', '-')
+            # Categoria: (categoria, caminho)
+            def category_from(cat_names: list):
+                if not cat_names:
+                    return None
+                return cat_names[-1].lower().replace(' ', '-'), cat_names
+
+            def category_from_categorizacoes():
+                cats = produto().get('categorizacoes', [])
+                return category_from([c.get('nome') for c in cats if c.get('nome')])
+
+            def category_from_breadcrumb_data():
+                # Breadcrumb do dataProduct, pulando "Home" (primeiro item)
+                breadcrumb_data = (data_product() or {}).get('breadcrumb', [])
+                return category_from([b.get('nome') for b in breadcrumb_data[1:]
+                                      if b.get('nome') and b.get('nome') != 'Home'])
+
+            def category_from_html():
+                breadcrumb = dom().all('breadcrumb')
+                return category_from([doc.text(a) for a in breadcrumb[1:]])
+
+            category, category_path = self._first_hit('category', {
+                'categorizacoes': category_from_categorizacoes,
+                'breadcrumb_data': category_from_breadcrumb_data,
+                'html': category_from_html,
+            }) or (None, [])
 
             # Especificações (características)
             specs = {}
-            carac_section = soup.select_one('#caracteristicas .grupo-carac, #caracteristicas dl, .caracteristicas-produto')
-            if carac_section:
-                dts = carac_section.select('dt')
-                dds = carac_section.select('dd')
+            carac_section = None
+            if HTML_HINTS['specs'].search(html_content):
+                carac_section = dom().first('specs')
+            if carac_section is not None:
+                dts = doc.all('spec_terms', carac_section)
+                dds = doc.all('spec_values', carac_section)
                 for dt, dd in zip(dts, dds):
-                    key = dt.get_text(strip=True)
-                    value = dd.get_text(strip=True)
+                    key = doc.text(dt)
+                    value = doc.text(dd)
                     if key and value and key.lower() not in ('referência', 'sku'):
                         specs[key] = value
 
             # Datasheet
             datasheet = None
-            datasheet_el = soup.select_one('a[href*="datasheet"], a[href*="manual"], a[href$=".pdf"]')
-            if datasheet_el:
-                datasheet = datasheet_el.get('href')
+            datasheet_el = None
+            if HTML_HINTS['datasheet'].search(html_content):
+                datasheet_el = dom().first('datasheet')
+            if datasheet_el is not None:
+                datasheet = doc.attr(datasheet_el, 'href')
                 if datasheet and not datasheet.startswith('http'):
                     datasheet = urljoin(self.base_url, datasheet)
 
             # Garantia
-            warranty = None
-            if data_product:
-                warranty = data_product.get('produto', {}).get('garantias')
-            if not warranty:
-                # Fallback: procurar no HTML
-                warranty_el = soup.select_one('.garantia, [class*="warranty"], [class*="garantia"]')
-                if warranty_el:
-                    warranty = warranty_el.get_text(strip=True)
+            def warranty_from_html():
+                if not HTML_HINTS['warranty'].search(html_content):
+                    return None
+                warranty_el = dom().first('warranty')
+                return doc.text(warranty_el) if warranty_el is not None else None
+
+            warranty = self._first_hit('warranty', {
+                'dataProduct': lambda: produto().get('garantias'),
+                'html': warranty_from_html,
+            })
 
             # Vídeos (Loja Vale / Magazord)
             videos = []
-            video_elements = soup.select('.video-mini[data-url-video]')
+            video_elements = []
+            if HTML_HINTS['videos'].search(html_content):
+                video_elements = dom().all('videos')
             for video_el in video_elements:
-                video_url = video_el.get('data-url-video', '').strip()
+                video_url = doc.attr(video_el, 'data-url-video', '').strip()
                 if video_url:
                     # Detectar plataforma
                     platform = 'unknown'
@@ -951,6 +2339,8 @@ class MagazordScraper(BaseScraper):
             # Slug
             slug = url.replace(self.base_url, '').strip('/')
 
+            self._count_parse(no_dom=doc is None)
+
             # Gerar ID único
             product_id = f"{self.id_prefix}{sku}"
 
@@ -983,27 +2373,446 @@ class MagazordScraper(BaseScraper):
             return None
 
 
+# Scrapers já montados em cada processo de parse, por (fornecedor, engine de parse)
+_worker_scrapers: Dict[tuple, 'MagazordScraper'] = {}
+
+
+def _parse_in_worker(spec: tuple, url: str, html_content: str) -> Tuple[Optional[Product], dict, dict]:
+    """Parse de uma página em processo filho; retorna o produto, as estatísticas e os acertos por caminho desse parse"""
+    scraper = _worker_scrapers.get(spec)
+    if scraper is None:
+        supplier_key, parser_engine = spec
+        scraper = _worker_scrapers[spec] = MagazordScraper(supplier_key, parser_engine=parser_engine)
+    scraper.parse_stats = {'pages': 0, 'no_dom': 0}
+    scraper.path_hits = {}
+    product = scraper.parse_html(url, html_content)
+    return product, scraper.parse_stats, scraper.path_hits
+
+
+def start_parse_pool(processes: Optional[int] = None) -> ProcessPoolExecutor:
+    """Pool de processos de parse compartilhado pelos fornecedores"""
+    pool = ProcessPoolExecutor(max_workers=processes or os.cpu_count() or 1)
+    # Sobe os processos já aqui, antes das threads de fetch: fork com threads
+    # ativas pode herdar locks travados (logging, sqlite)
+    pool.submit(int).result()
+    return pool
+
+
+# Estado de cada processo do re-parse offline (--from-cache)
+_reparse_cache: Optional[HtmlCache] = None
+_reparse_parser = 'soup'
+
+
+def _init_reparse_worker(cache_root: Path, parser_engine: str = 'soup'):
+    global _reparse_cache, _reparse_parser
+    _reparse_cache = HtmlCache(cache_root)
+    _reparse_parser = parser_engine
+
+
+def _reparse_page(task: tuple) -> Optional[Product]:
+    """Re-extrai um produto do HTML em cache (roda em processo filho)"""
+    supplier_key, url, content_hash = task
+    html_content = _reparse_cache.get(content_hash)
+    if not html_content:
+        return None
+    return _parse_in_worker((supplier_key, _reparse_parser), url, html_content)[0]
+
+
+def reparse_from_cache(sources: list[str], db: ProductsDB, html_cache: HtmlCache,
+                       min_price: float, processes: Optional[int] = None,
+                       parser_engine: str = 'soup') -> list[Product]:
+    """Refaz a extração de todo o catálogo a partir do HtmlCache, sem rede, usando todos os cores"""
+    tasks = []
+    for source in sources:
+        entries = db.get_html_cache_entries(SUPPLIERS[source]['name'])
+        logger.info(f"{SUPPLIERS[source]['name']}: {len(entries)} páginas em cache")
+        tasks.extend((source, url, content_hash) for url, content_hash in entries)
+
+    processes = processes or os.cpu_count() or 1
+    logger.info(f"Re-parse offline de {len(tasks)} páginas com {processes} processos...")
+
+    products = []
+    started = time.monotonic()
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_reparse_worker,
+                             initargs=(html_cache.root, parser_engine)) as executor:
+        for product in executor.map(_reparse_page, tasks, chunksize=16):
+            if product and product.price and product.price >= min_price:
+                db.update_product_cache(product)
+                products.append(product)
+    db.flush()
+
+    elapsed = time.monotonic() - started
+    logger.info(f"Re-parse concluído: {len(products)} produtos válidos de {len(tasks)} páginas "
+                f"em {elapsed:.1f}s ({len(tasks) / max(elapsed, 1e-9):.0f} páginas/s)")
+    return products
+
+
+def compare_parsers(sources: list[str], db: ProductsDB, html_cache: HtmlCache,
+                    limit: Optional[int] = None, max_examples: int = 5) -> int:
+    """Roda as engines soup e lxml sobre o HtmlCache e compara campo a campo
+
+    Retorna o número de páginas cujo resultado diverge entre as engines.
+    """
+    total_pages = 0
+    total_mismatches = 0
+    for source in sources:
+        engines = {name: MagazordScraper(source, parser_engine=name) for name in PARSER_ENGINES}
+        entries = db.get_html_cache_entries(SUPPLIERS[source]['name'])[:limit]
+        elapsed = dict.fromkeys(engines, 0.0)
+        field_diffs: Dict[str, int] = {}
+        examples = []
+        mismatched_pages = 0
+
+        for url, content_hash in entries:
+            html_content = html_cache.get(content_hash)
+            if not html_content:
+                continue
+            results = {}
+            for name, scraper in engines.items():
+                started = time.perf_counter()
+                product = scraper.parse_html(url, html_content)
+                elapsed[name] += time.perf_counter() - started
+                results[name] = product.to_dict() if product else {}
+
+            soup_data, lxml_data = results['soup'], results['lxml']
+            diff = sorted(k for k in soup_data.keys() | lxml_data.keys() if soup_data.get(k) != lxml_data.get(k))
+            if diff:
+                mismatched_pages += 1
+                for key in diff:
+                    field_diffs[key] = field_diffs.get(key, 0) + 1
+                if len(examples) < max_examples:
+                    examples.append((url, diff))
+            total_pages += 1
+
+        name = SUPPLIERS[source]['name']
+        timing = ', '.join(f"{engine} {len(entries) / max(t, 1e-9):.0f} páginas/s" for engine, t in elapsed.items())
+        logger.info(f"{name}: {len(entries)} páginas, {mismatched_pages} divergentes ({timing})")
+        for key, count in sorted(field_diffs.items(), key=lambda kv: -kv[1]):
+            logger.info(f"  campo {key}: {count} divergências")
+        for url, diff in examples:
+            logger.info(f"  ex.: {url} -> {', '.join(diff)}")
+        total_mismatches += mismatched_pages
+
+    logger.info(f"Comparação concluída: {total_mismatches} de {total_pages} páginas divergentes")
+    return total_mismatches
+
+
+def atomic_write(path: Path, data: bytes):
+    """Grava em temporário no mesmo diretório e troca com os.replace: nunca fica um arquivo pela metade"""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp cria com 0600; arquivos publicados precisam ser legíveis pelo servidor
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def write_json_artifacts(path: Path, min_path: Path, data: Any) -> Dict[str, int]:
+    """Grava o JSON legível, a versão minificada e os irmãos .gz/.br da minificada
+
+    Os comprimidos saem antes do .min.json para o host nunca ter um irmão
+    mais velho que o original. Retorna o tamanho em bytes de cada arquivo.
+    """
+    minified = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    outputs = {min_path.with_name(min_path.name + '.gz'): gzip.compress(minified, compresslevel=9, mtime=0)}
+    br_path = min_path.with_name(min_path.name + '.br')
+    if brotli is not None:
+        outputs[br_path] = brotli.compress(minified, quality=11)
+    else:
+        # Sem brotli: um .br de execução anterior ficaria desatualizado
+        br_path.unlink(missing_ok=True)
+    outputs[min_path] = minified
+    outputs[path] = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+    for output, content in outputs.items():
+        atomic_write(output, content)
+    return {output.name: len(content) for output, content in outputs.items()}
+
+
+class ProductJournal:
+    """Checkpoints do crawl em JSONL só de append (um produto por linha)
+
+    Os workers só enfileiram; uma thread grava as linhas em lotes. O
+    products.json é montado uma vez no fim (compactação) e o journal apagado;
+    se a execução morrer antes, a próxima reaplica o journal com replay().
+    """
+
+    FLUSH_INTERVAL = 0.5  # Segundos entre flushes do arquivo para o sistema operacional
+
+    def __init__(self, path: Path = JOURNAL_FILE):
+        self.path = path
+        self._queue: queue.Queue = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_lock = threading.Lock()
+
+    def append(self, product: Product):
+        """Registra um produto extraído (a thread writer sobe no primeiro uso)"""
+        if self._writer is None:
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name='journal-writer', daemon=True)
+                    self._writer.start()
+        self._queue.put(product)
+
+    def _write_loop(self):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            while True:
+                item = self._queue.get()
+                deadline = time.monotonic() + self.FLUSH_INTERVAL
+                while item is not None:
+                    f.write(json.dumps(item.to_dict(), ensure_ascii=False) + '\n')
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                f.flush()
+                if item is None:
+                    os.fsync(f.fileno())
+                    return
+
+    def close(self):
+        """Grava o que está na fila e para a thread writer"""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def replay(self) -> List[dict]:
+        """Produtos do journal de uma execução interrompida (linha final truncada é ignorada)"""
+        if not self.path.exists():
+            return []
+        products = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    products.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Journal: linha inválida ignorada ({len(line)} bytes)")
+        return products
+
+    def clear(self):
+        """Descarta o journal depois da compactação no products.json"""
+        self.path.unlink(missing_ok=True)
+
+
+# Fornecedores processados em paralelo escrevem o mesmo arquivo
+_save_lock = threading.Lock()
+
+
 def save_products(products: list[Product], sources: list[str]):
-    """Salva produtos no arquivo JSON"""
-    # Carregar produtos existentes de outros fornecedores
-    existing_products = []
+    """Salva produtos no arquivo JSON (substitui os produtos dos fornecedores em sources)"""
+    with _save_lock:
+        return _save_products(products, sources)
+
+
+def merge_products(products: list[dict]) -> int:
+    """Atualiza produtos no arquivo JSON pelo id, mantendo os demais (replay do journal)"""
+    with _save_lock:
+        by_id = {p.get('id'): p for p in _load_saved_products()}
+        for p in products:
+            by_id[p.get('id')] = p
+        _write_products_file(list(by_id.values()))
+        return len(products)
+
+
+def _load_saved_products() -> list[dict]:
     if PRODUCTS_FILE.exists():
         try:
             with open(PRODUCTS_FILE, 'r', encoding='utf-8') as f:
-                old_data = json.load(f)
-                # Manter produtos de fornecedores que não estamos atualizando
-                for p in old_data.get('products', []):
-                    if p.get('supplier') not in [SUPPLIERS[s]['name'] for s in sources]:
-                        existing_products.append(p)
+                return json.load(f).get('products', [])
         except json.JSONDecodeError:
             pass
+    return []
+
+
+def _save_products(products: list[Product], sources: list[str]):
+    # Manter produtos de fornecedores que não estamos atualizando
+    refreshed = {SUPPLIERS[s]['name'] for s in sources}
+    existing_products = [p for p in _load_saved_products() if p.get('supplier') not in refreshed]
 
     # Converter produtos para dicionários
     new_products = [p.to_dict() for p in products]
 
     # Combinar produtos existentes com novos
-    all_products = existing_products + new_products
+    _write_products_file(existing_products + new_products)
+
+    return len(new_products)
+
+
+# Catálogo paginado do produtos.html: uma pasta por categoria (+ 'all'), páginas na ordem padrão (nome)
+CATALOG_PAGE_SIZE = 20  # Igual ao PRODUCTS_PER_PAGE do produtos.html
+# Campos usados pelo card, filtros e carrinho do produtos.html
+CARD_FIELDS = ('id', 'slug', 'sku', 'name', 'brand', 'price', 'priceFormatted', 'image', 'inStock',
+               'category', 'sourceUrl', 'attributes')
 
+
+def fold_text(text: str) -> str:
+    """Minúsculas sem acentos ('Elétrica' -> 'eletrica'), como o foldText do produtos.html"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+SEARCH_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def search_tokens(text: str) -> List[str]:
+    """Tokens de busca: trechos [a-z0-9] do texto sem acentos"""
+    return SEARCH_TOKEN_RE.findall(fold_text(text))
+
+
+def compact_json(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _write_json_files(directory: Path, files: Dict[str, bytes]) -> int:
+    """Grava {caminho relativo: conteúdo} em directory (na ordem dada) e apaga o que sobrou de gerações anteriores
+
+    Arquivos com o mesmo conteúdo não são regravados; retorna quantos foram escritos.
+    """
+    written = 0
+    for relative, content in files.items():
+        path = directory / relative
+        try:
+            if path.read_bytes() == content:
+                continue
+        except FileNotFoundError:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, content)
+        written += 1
+    for path in directory.rglob('*.json'):
+        if path.relative_to(directory).as_posix() not in files:
+            path.unlink()
+    for path in sorted(directory.rglob('*'), reverse=True):
+        if path.is_dir() and not any(path.iterdir()):
+            path.rmdir()
+    return written
+
+
+def write_catalog_pages(all_products: list[dict], categories: list[dict], last_updated: str):
+    """Gera catalog/pages: páginas de CATALOG_PAGE_SIZE cards por categoria e manifest.json
+
+    O produtos.html lê o manifest e baixa só a página exibida; busca e
+    filtros extras continuam usando o products.min.json completo.
+    """
+    ordered = sorted(all_products, key=lambda p: (fold_text(p.get('name', '')), p.get('name', '')))
+    cards = [{key: p[key] for key in CARD_FIELDS if key in p} for p in ordered]
+
+    # Pasta de categoria = doc_key do id: ids distintos ('automação'/'automacao') nunca
+    # dividem pasta, e '_all' não sai de doc_key (o '_' sempre vem em '_<hex>_')
+    shards = [('', '_all', 'Todas categorias', cards)]
+    for category in categories:
+        path = doc_key(category['id']) or 'sem-categoria'
+        shards.append((category['id'], path, category['name'],
+                       [card for card in cards if card.get('category') == category['id']]))
+
+    files = {}
+    entries = []
+    for category_id, path, name, shard_cards in shards:
+        sizes = []
+        for number, start in enumerate(range(0, len(shard_cards), CATALOG_PAGE_SIZE), 1):
+            content = compact_json({'page': number, 'products': shard_cards[start:start + CATALOG_PAGE_SIZE]})
+            files[f'{path}/{number}.json'] = content
+            sizes.append(len(content))
+        entries.append({'id': category_id, 'name': name, 'path': path,
+                        'count': len(shard_cards), 'pages': len(sizes), 'bytes': sizes})
+
+    voltages = {}
+    for card in cards:
+        voltage = (card.get('attributes') or {}).get('voltage_v')
+        if voltage:
+            voltages[voltage] = voltages.get(voltage, 0) + 1
+
+    # Manifest por último: quando ele aparece, as páginas que cita já existem
+    files['manifest.json'] = compact_json({
+        'lastUpdated': last_updated,
+        'pageSize': CATALOG_PAGE_SIZE,
+        'totalProducts': len(cards),
+        'all': entries[0],
+        'categories': entries[1:],
+        'voltages': [{'value': v, 'count': voltages[v]} for v in sorted(voltages)],
+    })
+    _write_json_files(CATALOG_DIR / 'pages', files)
+
+    logger.info(f"Catálogo paginado: {len(entries) - 1} categorias, {len(files) - 1} páginas em {CATALOG_DIR / 'pages'}")
+
+
+# Índice de listagem (catalog/index.json): só os campos de card
+LISTING_FIELDS = ('id', 'slug', 'name', 'price', 'image', 'category', 'inStock')
+
+
+def doc_key(value: str) -> str:
+    """Nome de arquivo para um id/slug: fora de [A-Za-z0-9-] vira _<hex do code point>_ (docKey no produto.html)"""
+    return re.sub(r'[^A-Za-z0-9-]', lambda m: f'_{ord(m.group()):x}_', str(value))
+
+
+def write_product_docs(all_products: list[dict], last_updated: str):
+    """Gera catalog/index.json (listagem leve) e um documento por produto em catalog/products/{id,slug}/
+
+    O produto.html busca só o documento do produto exibido (por id ou
+    slug) e o índice para os relacionados. Documentos cujo conteúdo não
+    mudou não são regravados. Em id/slug repetido vale o primeiro na
+    ordem do products.json, como no find() do site.
+    """
+    files = {}
+    for p in all_products:
+        content = None
+        for kind in ('id', 'slug'):
+            if not p.get(kind):
+                continue
+            relative = f'{kind}/{doc_key(p[kind])}.json'
+            if relative not in files:
+                content = content or compact_json(p)
+                files[relative] = content
+    written = _write_json_files(CATALOG_DIR / 'products', files)
+
+    listing = [{key: p[key] for key in LISTING_FIELDS if key in p} for p in all_products]
+    atomic_write(CATALOG_DIR / 'index.json', compact_json({'lastUpdated': last_updated, 'products': listing}))
+
+    logger.info(f"Documentos por produto: {written} reescritos de {len(files)} em {CATALOG_DIR / 'products'}")
+
+
+def write_search_index(all_products: list[dict], last_updated: str):
+    """Gera catalog/search.json: índice invertido token -> ordinais no products.json
+
+    Tokens do nome e da marca, do SKU em partes e inteiro ('LV-00007' ->
+    lv, 00007, lv00007). Tokens ordenados permitem busca por prefixo com
+    busca binária; as listas de ordinais são crescentes e gravadas como
+    diferenças (delta) para ficarem menores.
+    """
+    postings: Dict[str, List[int]] = {}
+    for ordinal, p in enumerate(all_products):
+        sku_tokens = search_tokens(p.get('sku', ''))
+        tokens = set(search_tokens(p.get('name', '')) + search_tokens(p.get('brand', '')) + sku_tokens)
+        if len(sku_tokens) > 1:
+            tokens.add(''.join(sku_tokens))
+        for token in tokens:
+            postings.setdefault(token, []).append(ordinal)
+
+    tokens = sorted(postings)
+    deltas = []
+    for token in tokens:
+        ordinals = postings[token]
+        deltas.append([ordinals[0]] + [b - a for a, b in zip(ordinals, ordinals[1:])])
+
+    content = compact_json({
+        'lastUpdated': last_updated,
+        'totalProducts': len(all_products),
+        'tokens': tokens,
+        'postings': deltas,
+    })
+    atomic_write(CATALOG_DIR / 'search.json', content)
+    logger.info(f"Índice de busca: {len(tokens)} tokens, {len(content) / 1024:.0f} KB em {CATALOG_DIR / 'search.json'}")
+
+
+def _write_products_file(all_products: list[dict]):
     # Ordenar por nome
     all_products.sort(key=lambda x: x.get('name', ''))
 
@@ -1029,13 +2838,50 @@ def save_products(products: list[Product], sources: list[str]):
         'categories': categories
     }
 
-    # Salvar
-    with open(PRODUCTS_FILE, 'w', encoding='utf-8') as f:
+    # Salvar (escrita atômica, + minificado e pré-comprimidos)
+    sizes = write_json_artifacts(PRODUCTS_FILE, MIN_PRODUCTS_FILE, data)
+
+    logger.info(f"Salvos {len(all_products)} produtos em {PRODUCTS_FILE} "
+                f"({', '.join(f'{name}: {size / 1024:.0f} KB' for name, size in sizes.items())})")
+
+    write_catalog_pages(all_products, categories, data['lastUpdated'])
+    write_product_docs(all_products, data['lastUpdated'])
+    write_search_index(all_products, data['lastUpdated'])
+
+
+def save_changes(changes: list[dict]):
+    """Salva os change sets da execução: quais grupos de campos mudaram em cada produto
+
+    Syncs (ex: ml_sync.py --changed-only) usam o arquivo para atualizar só o que mudou.
+    """
+    groups = {group: sum(group in change['groups'] for change in changes) for group in FIELD_GROUPS}
+    data = {
+        'generatedAt': datetime.now(timezone.utc).isoformat(),
+        'totalChanges': len(changes),
+        'groups': groups,
+        'changes': sorted(changes, key=lambda change: change['id'])
+    }
+    with open(CHANGES_FILE, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
-    logger.info(f"Salvos {len(all_products)} produtos em {PRODUCTS_FILE}")
+    summary = ', '.join(f"{group}: {count}" for group, count in groups.items() if count)
+    logger.info(f"Change sets: {len(changes)} produtos novos/alterados ({summary or 'nada mudou'}) em {CHANGES_FILE}")
 
-    return len(new_products)
+
+# Colunas dos atributos normalizados nas exportações: (cabeçalho, chave em attributes)
+ATTRIBUTE_COLUMNS = [
+    ('tensao_v', 'voltage_v'),
+    ('potencia_w', 'power_w'),
+    ('potencia_va', 'power_va'),
+    ('secao_mm2', 'section_mm2'),
+    ('comprimento_m', 'length_m'),
+]
+
+
+def attribute_cells(product: dict) -> list:
+    """Valores das colunas de ATTRIBUTE_COLUMNS (vazio quando o atributo não existe)"""
+    attributes = product.get('attributes') or {}
+    return [attributes.get(key, '') for _, key in ATTRIBUTE_COLUMNS]
 
 
 def export_mercadolivre(products: list[dict], output_file: Path):
@@ -1044,7 +2890,7 @@ def export_mercadolivre(products: list[dict], output_file: Path):
         'titulo', 'descricao', 'preco', 'quantidade', 'condicao',
         'marca', 'modelo_sku', 'gtin', 'imagem_principal', 'imagens_adicionais',
         'categoria', 'peso_kg', 'comprimento_cm', 'largura_cm', 'altura_cm'
-    ]
+    ] + [header for header, _ in ATTRIBUTE_COLUMNS]
 
     with open(output_file, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
@@ -1077,7 +2923,7 @@ def export_mercadolivre(products: list[dict], output_file: Path):
                 dims.get('length', 20),
                 dims.get('width', 15),
                 dims.get('height', 10)
-            ]
+            ] + attribute_cells(p)
             writer.writerow(row)
 
     logger.info(f"Exportados {len(products)} produtos para {output_file} (Mercado Livre)")
@@ -1090,7 +2936,7 @@ def export_shopee(products: list[dict], output_file: Path):
         'peso', 'comprimento', 'largura', 'altura',
         'imagem_1', 'imagem_2', 'imagem_3', 'imagem_4', 'imagem_5',
         'categoria'
-    ]
+    ] + [header for header, _ in ATTRIBUTE_COLUMNS]
 
     with open(output_file, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
@@ -1122,7 +2968,7 @@ def export_shopee(products: list[dict], output_file: Path):
                 dims.get('height', 10),
                 images[0], images[1], images[2], images[3], images[4],
                 ' > '.join(p.get('categoryPath') or [p.get('category', '')])
-            ]
+            ] + attribute_cells(p)
             writer.writerow(row)
 
     logger.info(f"Exportados {len(products)} produtos para {output_file} (Shopee)")
@@ -1137,11 +2983,24 @@ def main():
     parser.add_argument('--min-price', type=float, default=100.0,
                         help='Preço mínimo em R$ (default: 100)')
     parser.add_argument('--delay', type=float, default=0.3,
-                        help='Delay entre requests em segundos (default: 0.3)')
+                        help='Delay base do backoff entre tentativas em segundos (default: 0.3)')
+    parser.add_argument('--parallel-sources', action='store_true',
+                        help='Processar todos os fornecedores ao mesmo tempo (cada um com seus workers e pacing)')
+    parser.add_argument('--rps', type=float,
+                        help='Requests por segundo por fornecedor (default: rate_limit de SUPPLIERS)')
     parser.add_argument('--workers', type=int, default=8,
                         help='Número de workers paralelos (default: 8)')
+    parser.add_argument('--engine', choices=['threads', 'async'], default='threads',
+                        help='Engine de fetch: threads ou async (asyncio + aiohttp) (default: threads)')
+    parser.add_argument('--concurrency', type=int, default=128,
+                        help='Máximo de requests em voo na engine async (default: 128)')
+    parser.add_argument('--per-host', type=int, default=32,
+                        help='Máximo de conexões simultâneas por host na engine async (default: 32)')
     parser.add_argument('--incremental', action='store_true',
                         help='Modo incremental - só baixa produtos alterados')
+    parser.add_argument('--lastmod', action='store_true',
+                        help='Só baixar URLs novas ou com lastmod do sitemap posterior ao último scrape '
+                             '(as demais vêm do cache)')
     parser.add_argument('--resume', action='store_true',
                         help='Continuar de onde parou (não reinicia do zero)')
     parser.add_argument('--reset', action='store_true',
@@ -1152,10 +3011,27 @@ def main():
                         help='Exportar para marketplace')
     parser.add_argument('-o', '--output', type=str,
                         help='Arquivo de saída para exportação')
+    parser.add_argument('--from-cache', action='store_true',
+                        help='Refazer a extração a partir do HTML em cache, sem acessar a rede')
+    parser.add_argument('--processes', type=int,
+                        help='Processos de parse, no crawl e no --from-cache (default: número de CPUs; '
+                             '0 = parse nas próprias threads de fetch)')
+    parser.add_argument('--no-html-cache', action='store_true',
+                        help='Não salvar o HTML bruto das páginas em scripts/html_cache')
+    parser.add_argument('--parser', choices=list(PARSER_ENGINES), default='soup',
+                        help='Engine de parse do HTML: soup (BeautifulSoup) ou lxml (default: soup)')
+    parser.add_argument('--compare-parsers', action='store_true',
+                        help='Comparar campo a campo as engines soup e lxml sobre o HTML em cache')
     args = parser.parse_args()
 
+    if args.engine == 'async' and aiohttp is None:
+        logger.error("--engine async requer o pacote aiohttp (pip install aiohttp)")
+        return 1
+
     # Inicializar banco de dados
     db = ProductsDB()
+    # Em qualquer saída, fecha as conexões: o WAL volta para o products.db (que vai para o cache do CI)
+    atexit.register(db.close)
 
     # Se for apenas status
     if args.status:
@@ -1167,6 +3043,7 @@ def main():
             print(f"  Concluídos: {progress['done']}")
             print(f"  Pendentes: {progress['pending']}")
             print(f"  Erros: {progress['errors']}")
+            print(f"  Descontinuados: {progress['discontinued']}")
             print()
         return 0
 
@@ -1203,12 +3080,40 @@ def main():
     else:
         sources = [args.source]
 
+    # Validação da engine lxml contra a soup, sem rede
+    if args.compare_parsers:
+        limit = 10 if args.test else None
+        return 1 if compare_parsers(sources, db, HtmlCache(), limit) else 0
+
+    # Re-parse offline do catálogo a partir do HTML em cache
+    if args.from_cache:
+        products = reparse_from_cache(sources, db, HtmlCache(), args.min_price, args.processes, args.parser)
+        if not products:
+            logger.warning("Nenhum produto encontrado no cache!")
+            return 1
+        save_products(products, sources)
+        return 0
+
+    html_cache = None if args.no_html_cache else HtmlCache()
+    parse_processes = (os.cpu_count() or 1) if args.processes is None else args.processes
+    parse_pool = start_parse_pool(parse_processes) if parse_processes > 0 else None
+
     logger.info(f"Iniciando scraper - Fontes: {', '.join(sources)}, Preço mínimo: R$ {args.min_price}")
-    logger.info(f"Workers: {args.workers}, Delay: {args.delay}s, Resume: {args.resume}")
+    logger.info(f"Workers: {args.workers}, Delay: {args.delay}s, Resume: {args.resume}, "
+                f"Engine: {args.engine}, Parser: {args.parser}, Processos de parse: {parse_processes}")
+
+    # Journal sobrando = execução anterior morreu antes da compactação: aplicar no products.json
+    journal = ProductJournal()
+    recovered = journal.replay()
+    if recovered:
+        merge_products(recovered)
+        logger.info(f"Journal: {len(recovered)} produtos recuperados de uma execução interrompida")
+    journal.clear()
 
     all_products = []
+    all_changes = []
 
-    for source in sources:
+    def scrape_source(source: str) -> list[Product]:
         logger.info(f"\n{'='*50}")
         logger.info(f"Processando: {SUPPLIERS[source]['name']}")
         logger.info(f"{'='*50}")
@@ -1222,36 +3127,65 @@ def main():
             source,
             min_price=args.min_price,
             delay=args.delay,
-            workers=args.workers
+            workers=args.workers,
+            engine=args.engine,
+            concurrency=args.concurrency,
+            per_host=args.per_host,
+            rate_limit=args.rps,
+            html_cache=html_cache,
+            parser_engine=args.parser,
+            parse_pool=parse_pool
         )
 
         limit = 10 if args.test else None
 
-        # Callback para salvar incrementalmente
-        def incremental_save(prods, src):
-            save_products(prods, [source])
-
         products = scraper.scrape_all(
             limit=limit,
             db=db,
             incremental=args.incremental,
             resume=args.resume,
-            save_callback=incremental_save,
-            save_interval=25  # Salvar a cada 25 produtos
+            since_lastmod=args.lastmod,
+            checkpoint=journal.append
         )
 
+        all_changes.extend(scraper.changes)
         if products:
-            all_products.extend(products)
             logger.info(f"Obtidos {len(products)} produtos de {SUPPLIERS[source]['name']}")
         else:
             logger.warning(f"Nenhum produto novo encontrado em {SUPPLIERS[source]['name']}")
+        return products
+
+    try:
+        if args.parallel_sources and len(sources) > 1:
+            # Cada fornecedor é um host diferente, com workers e budget de pacing próprios:
+            # todos rodam ao mesmo tempo e um fornecedor lento não atrasa os outros
+            logger.info(f"Processando {len(sources)} fornecedores em paralelo")
+            with ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix='supplier') as executor:
+                for products in executor.map(scrape_source, sources):
+                    all_products.extend(products)
+        else:
+            for source in sources:
+                all_products.extend(scrape_source(source))
+    finally:
+        if parse_pool:
+            parse_pool.shutdown()
+        journal.close()
 
     if not all_products:
         logger.warning("Nenhum produto encontrado em nenhuma fonte!")
+        journal.clear()
         return 1
 
-    # Salvar resultados
+    # Compactação: products.json montado uma vez; o journal só serve até aqui
     total_saved = save_products(all_products, sources)
+    journal.clear()
+    save_changes(all_changes)
+
+    # Descartar versões antigas de páginas que não são mais referenciadas
+    if html_cache:
+        removed = html_cache.prune(db.get_html_cache_hashes())
+        if removed:
+            logger.info(f"HTML cache: {removed} páginas obsoletas removidas")
 
     logger.info(f"\n{'='*50}")
     logger.info(f"CONCLUÍDO!")